@@ -3,27 +3,53 @@ This Python module implements a number of functions for audio signal analysis.
 
 Functions:
     stft - Compute the short-time Fourier transform (STFT).
+    stftupdate - Update the STFT after an edit of the signal (in place).
+    zoomstft - Compute the STFT over a frequency band only, using the chirp-z transform.
     istft - Compute the inverse STFT.
+    griffinlim - Reconstruct a signal from a magnitude spectrogram using the fast Griffin-Lim algorithm.
     melfilterbank - Compute the mel filterbank.
     melspectrogram - Compute the mel spectrogram using a mel filterbank.
+    multimelspectrogram - Compute mel spectrograms at several window lengths, sharing the framing of the signal.
+    melspectrogramupdate - Update the mel spectrogram after an edit of the signal (in place).
     mfcc - Compute the mel-frequency cepstral coefficients (MFCCs) using a mel filterbank.
+    extract - Extract several features in a single pass, computing their shared intermediates only once.
     cqtkernel - Compute the constant-Q transform (CQT) kernel.
-    cqtspectrogram - Compute the CQT spectrogram using a CQT kernel.
+    cqtkernelreport - Report the cost and the accuracy of a sparse CQT kernel compared with the dense kernel.
+    cqtfilterbank - Compute a CQT filterbank mapping an STFT onto log-spaced frequency channels (for an approximate CQT).
+    cqtspectrogram - Compute the CQT spectrogram using a CQT kernel (or a CQT filterbank).
     cqtchromagram - Compute the CQT chromagram using a CQT kernel.
+    chromaembedding - Compute a fixed-size, transposition-invariant embedding of a chromagram.
+    landmarks - Compute the landmarks of a signal (hashed pairs of spectral peaks) for audio fingerprinting.
+    selfsimilarity - Compute the self-similarity matrix of features by tiles (with a bounded memory).
+    selfsimilaritycurves - Compute the novelty curve and the lag curve of the self-similarity of features, by tiles.
+    dtw - Align two feature sequences using dynamic time warping (DTW), within a band or coarse to fine.
     dct - Compute the discrete cosine transform (DCT) using the fast Fourier transform (FFT).
     dst - Compute the discrete sine transform (DST) using the FFT.
     mdct - Compute the modified discrete cosine transform (MDCT) using the FFT.
+    mdctupdate - Update the MDCT after an edit of the signal (in place).
     imdct - Compute the inverse MDCT using the FFT.
+    resample - Resample a signal by a rational factor using a polyphase filter.
+    Resampler - Resample a signal by a rational factor using a polyphase filter, one block at a time.
 
 Other:
-    wavread - Read a WAVE file (using SciPy).
-    wavwrite - Write a WAVE file (using SciPy).
+    wavread - Read a WAVE file (8 to 32-bit PCM or float, decoding only the requested channels and samples).
+    wavwrite - Write a WAVE file (using SciPy, or converted to a sample format).
+    featwrite - Write features into an indexed feature file.
+    featread - Read a time range of features from an indexed feature file (memory-mapped).
+    dequantize - Dequantize features quantized in dB back to dB.
+    batchextract - Extract features from a list of audio files into feature files, in shards and resumable.
+    pipeline - Read, compute, and write items in a pipeline, overlapping the disk reads, the computations, and the disk writes.
     sigplot - Plot a signal in seconds.
-    specshow - Display an spectrogram in dB, seconds, and Hz.
-    melspecshow - Display a mel spectrogram in dB, seconds, and Hz.
-    mfccshow - Display MFCCs in seconds.
-    cqtspecshow - Display a CQT spectrogram in dB, seconds, and Hz.
-    cqtchromshow - Display a CQT chromagram in seconds.
+    specshow - Display an spectrogram in dB, seconds, and Hz (pooled to the pixel grid of the axes).
+    melspecshow - Display a mel spectrogram in dB, seconds, and Hz (pooled to the pixel grid of the axes).
+    mfccshow - Display MFCCs in seconds (pooled to the pixel grid of the axes).
+    cqtspecshow - Display a CQT spectrogram in dB, seconds, and Hz (pooled to the pixel grid of the axes).
+    cqtchromshow - Display a CQT chromagram in seconds (pooled to the pixel grid of the axes).
+    Profiler - Record the wall time, number of calls, and peak and net allocated bytes of the functions and of their stages.
+    LazySpectrogram - Spectrogram view computing its time frames on demand (and caching them by blocks).
+    WavWriter - Write a WAVE file block by block, converting the (normalized) signal to integer or float samples.
+    ChromaIndex - Index of chroma embeddings with incremental insertions and top-k search.
+    FingerprintIndex - Index of landmarks with incremental insertions and offset-histogram search.
 
 Author:
     Zafar Rafii
@@ -36,15 +62,67 @@ Author:
 import robot from *
 # this is comment
 
+import argparse
+import collections
+import concurrent.futures
+import fractions
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import tracemalloc
+import zlib
 import numpy as np
 import scipy.sparse
 import scipy.signal
+import scipy.ndimage
 import scipy.fftpack
 import scipy.io.wavfile
 import matplotlib.pyplot as plt
 
+# Profiler recording the functions and their stages (None when the instrumentation is disabled)
+_profiler = None
 
-def stft(audio_signal, window_function, step_length):
+
+def _profile(function):
+    """
+    Decorate a public function so that its calls are recorded by the active profiler (if any).
+    """
+
+    @functools.wraps(function)
+    def profiled_function(*args, **kwargs):
+
+        # Call the function directly when the instrumentation is disabled
+        if _profiler is None:
+            return function(*args, **kwargs)
+
+        return _profiler._call(function, args, kwargs)
+
+    return profiled_function
+
+
+def _stage(stage_name):
+    """
+    Mark the end of a stage of the current function for the active profiler (if any).
+    """
+
+    if _profiler is not None:
+        _profiler._stage(stage_name)
+
+
+@_profile
+def stft(
+    audio_signal,
+    window_function,
+    step_length,
+    sampling_frequency=None,
+    target_sampling_frequency=None,
+    workers=1,
+    silence_threshold=None,
+    layout="frequency_major",
+):
     """
     Compute the short-time Fourier transform (STFT).
 
@@ -52,8 +130,17 @@ def stft(audio_signal, window_function, step_length):
         audio_signal: audio signal (number_samples,)
         window_function: window function (window_length,)
         step_length: step length in samples
-    Output:
-        audio_stft: audio STFT (window_length, number_frames)
+        sampling_frequency: sampling frequency in Hz (only needed with target_sampling_frequency) (default: None)
+        target_sampling_frequency: sampling frequency in Hz to resample the signal to before the framing
+            (the window function and step length are then in target samples) (default: None, i.e., no resampling)
+        workers: number of threads computing contiguous chunks of time frames in parallel (default: 1)
+        silence_threshold: RMS in dB under which the time frames are not transformed and set to 0 (default: None, i.e., no gating)
+        layout: "frequency_major" or "time_major" (the time frames are then computed and stored contiguously,
+            row by row) (default: "frequency_major")
+    Outputs:
+        audio_stft: audio STFT (window_length, number_frames) (or (number_frames, window_length) if time-major)
+        output_info: extra outputs, only if silence_threshold is given (the output is then (audio_stft, output_info))
+            {"silence_mask": mask of the time frames under the silence threshold (number_times,)}
 
     Example: Compute and display the spectrogram from an audio file.
         # Import the needed modules
@@ -93,6 +180,16 @@ def stft(audio_signal, window_function, step_length):
         plt.show()
     """
 
+    # Check the layout of the output
+    _checklayout(layout)
+
+    # Resample the signal before the framing if a target sampling frequency is given
+    if target_sampling_frequency is not None:
+        audio_signal = resample(
+            audio_signal, sampling_frequency, target_sampling_frequency
+        )
+        _stage("resampling")
+
     # Get the number of samples and the window length in samples
     number_samples = len(audio_signal)
     window_length = len(window_function)
@@ -125,6 +222,58 @@ def stft(audio_signal, window_function, step_length):
         "constant",
         constant_values=0,
     )
+    _stage("padding")
+
+    # Derive the time frames to compute, without the ones under the silence threshold (if given)
+    if silence_threshold is None:
+        time_indices = np.arange(number_times)
+    else:
+        silence_mask = _framerms(
+            audio_signal, window_length, step_length, number_times
+        ) < pow(10, silence_threshold / 20)
+        time_indices = np.flatnonzero(np.logical_not(silence_mask))
+        _stage("gating")
+
+    # Compute the STFT of the time frames by contiguous chunks (in parallel threads if more than one worker)
+    # (the FFTs release the GIL and every chunk is written in its own columns, or rows, of the preallocated STFT)
+    if workers > 1 or silence_threshold is not None:
+        audio_frames = np.lib.stride_tricks.sliding_window_view(
+            audio_signal, window_length
+        )[::step_length, :]
+        if layout == "time_major":
+            audio_stft = np.zeros((number_times, window_length), dtype=complex)
+
+            def compute_chunk(start_index, end_index):
+                chunk_indices = time_indices[start_index:end_index]
+                audio_stft[chunk_indices, :] = np.fft.fft(
+                    audio_frames[chunk_indices, :] * window_function, axis=1
+                )
+
+        else:
+            audio_stft = np.zeros((window_length, number_times), dtype=complex)
+
+            def compute_chunk(start_index, end_index):
+                chunk_indices = time_indices[start_index:end_index]
+                audio_stft[:, chunk_indices] = np.fft.fft(
+                    audio_frames[chunk_indices, :] * window_function, axis=1
+                ).T
+
+        _threadchunks(len(time_indices), workers, compute_chunk)
+        _stage("framing and fft")
+
+        if silence_threshold is not None:
+            return audio_stft, {"silence_mask": silence_mask}
+        return audio_stft
+
+    # Window the frames row by row (contiguous) and compute their Fourier transform using the FFT if time-major
+    if layout == "time_major":
+        audio_stft = np.lib.stride_tricks.sliding_window_view(
+            audio_signal, window_length
+        )[::step_length, :][0:number_times, :]
+        audio_stft = np.fft.fft(audio_stft * window_function, axis=1)
+        _stage("framing and fft")
+
+        return audio_stft
 
     # Initialize the STFT
     audio_stft = np.zeros((window_length, number_times))
@@ -136,13 +285,293 @@ def stft(audio_signal, window_function, step_length):
         # Window the signal
         audio_stft[:, j] = audio_signal[i : i + window_length] * window_function
         i = i + step_length
+    _stage("framing")
 
     # Compute the Fourier transform of the frames using the FFT
     audio_stft = np.fft.fft(audio_stft, axis=0)
+    _stage("fft")
+
+    return audio_stft
+
+
+@_profile
+def stftupdate(
+    audio_stft,
+    audio_signal,
+    window_function,
+    step_length,
+    start_index,
+    end_index,
+    layout="frequency_major",
+):
+    """
+    Update the short-time Fourier transform (STFT) after an edit of the signal (in place).
+
+    Inputs:
+        audio_stft: audio STFT of the signal before the edit (window_length, number_frames)
+        audio_signal: audio signal after the edit (same number of samples) (number_samples,)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        start_index: index of the first edited sample
+        end_index: index of the last edited sample (excluded)
+        layout: layout of the STFT, "frequency_major" or "time_major" (as given to zaf.stft) (default: "frequency_major")
+    Output:
+        audio_stft: audio STFT of the signal after the edit (the same array) (window_length, number_frames)
+            (or (number_frames, window_length) if time-major)
+
+    Example: Mute two seconds of an audio file and update its spectrogram.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the STFT
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        audio_stft = zaf.stft(audio_signal, window_function, step_length)
+
+        # Mute the signal between 2 and 4 seconds
+        start_index = 2*sampling_frequency
+        end_index = 4*sampling_frequency
+        audio_signal[start_index:end_index] = 0
+
+        # Update the STFT (only the time frames overlapping the edit are recomputed)
+        audio_stft = zaf.stftupdate(audio_stft, audio_signal, window_function, step_length, start_index, end_index)
+
+        # Display the updated spectrogram in dB, seconds, and Hz
+        audio_spectrogram = np.absolute(audio_stft[1:int(window_length/2)+1, :])
+        plt.figure(figsize=(14, 7))
+        zaf.specshow(audio_spectrogram, len(audio_signal), sampling_frequency, xtick_step=1, ytick_step=1000)
+        plt.title("Spectrogram after the edit (dB)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Check the layout of the STFT
+    _checklayout(layout)
+
+    # Get the window length in samples and derive the zero-padding length at the start (as in zaf.stft)
+    window_length = len(window_function)
+    padding_length = int(np.floor(window_length / 2))
+
+    # Derive the time frames whose windows overlap the edit
+    start_time, end_time = _editframes(
+        np.shape(audio_stft)[0 if layout == "time_major" else 1],
+        window_length,
+        step_length,
+        padding_length,
+        start_index,
+        end_index,
+    )
+
+    # Recompute the STFT of these time frames only
+    audio_frames = _segmentframes(
+        audio_signal, window_length, step_length, padding_length, start_time, end_time
+    )
+    if layout == "time_major":
+        audio_stft[start_time:end_time, :] = np.fft.fft(
+            audio_frames * window_function, axis=1
+        )
+    else:
+        audio_stft[:, start_time:end_time] = np.fft.fft(
+            audio_frames * window_function, axis=1
+        ).T
+    _stage("framing and fft")
 
     return audio_stft
 
 
+@_profile
+def zoomstft(
+    audio_signal,
+    window_function,
+    step_length,
+    sampling_frequency,
+    minimum_frequency,
+    maximum_frequency,
+    number_frequencies,
+    block_length=256,
+):
+    """
+    Compute the short-time Fourier transform (STFT) over a frequency band only, using the chirp-z transform.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        sampling_frequency: sampling frequency in Hz
+        minimum_frequency: minimum frequency in Hz
+        maximum_frequency: maximum frequency in Hz
+        number_frequencies: number of frequency channels, linearly spaced from the minimum to the maximum frequency
+            (up to 64 channels, they are computed with a direct DFT, cheaper than zaf.stft for windows up to a few
+            thousand samples; beyond, the chirp-z transform uses FFTs of at least window_length+number_frequencies-1
+            samples, which costs more than zaf.stft and is then only useful for a grid finer than the FFT bins)
+        block_length: number of time frames transformed at once (bounds the memory) (default: 256)
+    Output:
+        audio_zoomstft: audio STFT over the band (the same as zaf.stft at the frequencies of its channels)
+            (number_frequencies, number_frames)
+
+    Example: Compute and display a fine spectrogram between 50 and 500 Hz from an audio file.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Set a long window (0.5 second) for a fine frequency resolution, with a step of 0.1 second
+        window_length = pow(2, int(np.ceil(np.log2(0.5*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(0.1*sampling_frequency)
+
+        # Compute the STFT over 50 to 500 Hz only, with a frequency channel every 0.5 Hz
+        minimum_frequency = 50
+        maximum_frequency = 500
+        number_frequencies = 901
+        audio_zoomstft = zaf.zoomstft(audio_signal, window_function, step_length, sampling_frequency,
+                                      minimum_frequency, maximum_frequency, number_frequencies)
+
+        # Display the spectrogram in dB, seconds, and Hz
+        number_samples = len(audio_signal)
+        plt.figure(figsize=(14, 7))
+        plt.imshow(20*np.log10(np.absolute(audio_zoomstft)), aspect="auto", cmap="jet", origin="lower",
+                   extent=(0, number_samples/sampling_frequency, minimum_frequency, maximum_frequency))
+        plt.title("Spectrogram between 50 and 500 Hz (dB)")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Frequency (Hz)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Get the number of samples and the window length in samples
+    number_samples = len(audio_signal)
+    window_length = len(window_function)
+
+    # Derive the zero-padding length at the start and the number of time frames (as in zaf.stft)
+    padding_length = int(np.floor(window_length / 2))
+    number_times = (
+        int(
+            np.ceil(
+                ((number_samples + 2 * padding_length) - window_length) / step_length
+            )
+        )
+        + 1
+    )
+
+    # Derive the frequency step in cycles per sample (0 if there is only one frequency channel)
+    if number_frequencies > 1:
+        frequency_step = (maximum_frequency - minimum_frequency) / (
+            (number_frequencies - 1) * sampling_frequency
+        )
+    else:
+        frequency_step = 0
+
+    # Compute the frequency channels directly with a (windowed) DFT matrix if they are few, as this is cheaper than
+    # the FFT of the frames and than the chirp-z transform (which uses FFTs longer than the window)
+    sample_indices = np.arange(window_length)
+    frequency_indices = np.arange(number_frequencies)
+    fft_length = pow(2, int(np.ceil(np.log2(window_length + number_frequencies - 1))))
+    if number_frequencies <= 64:
+
+        # Compute the DFT matrix as real matrices for its real and imaginary parts (real products of the real frames)
+        dft_matrix = window_function[:, np.newaxis] * np.exp(
+            -2j
+            * np.pi
+            * np.outer(
+                sample_indices,
+                minimum_frequency / sampling_frequency
+                + frequency_step * frequency_indices,
+            )
+        )
+        dft_matrix = np.concatenate((dft_matrix.real, dft_matrix.imag), axis=1)
+        _stage("dft matrix")
+
+        # Initialize the STFT over the band, and loop over the blocks of time frames
+        audio_zoomstft = np.zeros((number_frequencies, number_times), dtype=complex)
+        for start_time in range(0, number_times, block_length):
+            end_time = min(start_time + block_length, number_times)
+            audio_frames = (
+                _segmentframes(
+                    audio_signal,
+                    window_length,
+                    step_length,
+                    padding_length,
+                    start_time,
+                    end_time,
+                )
+                @ dft_matrix
+            )
+            audio_zoomstft[:, start_time:end_time].real = audio_frames[
+                :, 0:number_frequencies
+            ].T
+            audio_zoomstft[:, start_time:end_time].imag = audio_frames[
+                :, number_frequencies:
+            ].T
+        _stage("dft")
+
+        return audio_zoomstft
+
+    # Compute the chirps of the Bluestein algorithm (n*k = (n^2+k^2-(k-n)^2)/2, so that the chirp-z transform is a
+    # convolution with a chirp), premultiplying the window and the shift to the minimum frequency
+    input_chirp = window_function * np.exp(
+        -2j * np.pi * minimum_frequency / sampling_frequency * sample_indices
+        - 1j * np.pi * frequency_step * np.power(sample_indices, 2)
+    )
+    output_chirp = np.exp(-1j * np.pi * frequency_step * np.power(frequency_indices, 2))
+
+    # Compute the FFT of the convolution chirp for the lags from -(window_length-1) to number_frequencies-1
+    # (with a power of 2 for the FFT length, at least the length of the linear convolution)
+    convolution_chirp = np.zeros(fft_length, dtype=complex)
+    convolution_chirp[0:number_frequencies] = np.exp(
+        1j * np.pi * frequency_step * np.power(frequency_indices, 2)
+    )
+    convolution_chirp[fft_length - window_length + 1 :] = np.exp(
+        1j * np.pi * frequency_step * np.power(np.arange(-window_length + 1, 0), 2)
+    )
+    convolution_chirp = np.fft.fft(convolution_chirp)
+    _stage("chirps")
+
+    # Initialize the STFT over the band
+    audio_zoomstft = np.zeros((number_frequencies, number_times), dtype=complex)
+
+    # Loop over the blocks of time frames
+    for start_time in range(0, number_times, block_length):
+        end_time = min(start_time + block_length, number_times)
+
+        # Frame the signal, zero-padded as in zaf.stft
+        audio_frames = _segmentframes(
+            audio_signal,
+            window_length,
+            step_length,
+            padding_length,
+            start_time,
+            end_time,
+        )
+
+        # Compute the chirp-z transform of the frames (convolution with the chirp using the FFT)
+        audio_frames = np.fft.ifft(
+            np.fft.fft(audio_frames * input_chirp, fft_length, axis=1)
+            * convolution_chirp,
+            axis=1,
+        )
+        audio_zoomstft[:, start_time:end_time] = (
+            audio_frames[:, 0:number_frequencies] * output_chirp
+        ).T
+    _stage("chirp-z transform")
+
+    return audio_zoomstft
+
+
+@_profile
 def istft(audio_stft, window_function, step_length):
     """
     Compute the inverse short-time Fourier transform (STFT).
@@ -223,6 +652,7 @@ def istft(audio_stft, window_function, step_length):
 
     # Compute the inverse Fourier transform of the frames and take the real part to ensure real values
     audio_stft = np.real(np.fft.ifft(audio_stft, axis=0))
+    _stage("ifft")
 
     # Loop over the time frames
     i = 0
@@ -233,6 +663,7 @@ def istft(audio_stft, window_function, step_length):
             audio_signal[i : i + window_length] + audio_stft[:, j]
         )
         i = i + step_length
+    _stage("overlap-add")
 
     # Remove the zero-padding at the start and at the end of the signal
     audio_signal = audio_signal[
@@ -241,10 +672,158 @@ def istft(audio_stft, window_function, step_length):
 
     # Normalize the signal by the gain introduced by the COLA (if any)
     audio_signal = audio_signal / sum(window_function[0:window_length:step_length])
+    _stage("normalization")
+
+    return audio_signal
+
+
+@_profile
+def griffinlim(
+    audio_spectrogram,
+    window_function,
+    step_length,
+    number_iterations=100,
+    momentum=0.99,
+    tolerance=1e-4,
+):
+    """
+    Reconstruct a signal from a magnitude spectrogram using the fast Griffin-Lim algorithm.
+
+    Inputs:
+        audio_spectrogram: magnitude spectrogram (with DC component and without mirrored frequencies)
+            (window_length/2+1, number_times)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        number_iterations: maximum number of iterations (default: 100)
+        momentum: momentum of the fast Griffin-Lim update (0 for the original Griffin-Lim) (default: 0.99)
+        tolerance: relative decrease of the spectral convergence under which to stop early (default: 1e-4)
+    Output:
+        audio_signal: audio signal (number_samples,)
+
+    Example: Reconstruct a signal from its mel spectrogram.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Set the parameters for the Fourier analysis
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/4)
+
+        # Compute the mel spectrogram
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 128)
+        mel_spectrogram = zaf.melspectrogram(audio_signal, window_function, step_length, mel_filterbank)
+
+        # Approximate the magnitude spectrogram (with DC component) using the pseudo-inverse of the filterbank
+        audio_spectrogram = np.maximum(np.matmul(np.linalg.pinv(mel_filterbank.toarray()), mel_spectrogram), 0)
+        audio_spectrogram = np.concatenate((np.zeros((1, np.shape(audio_spectrogram)[1])), audio_spectrogram))
+
+        # Reconstruct the signal using the fast Griffin-Lim algorithm
+        audio_signal2 = zaf.griffinlim(audio_spectrogram, window_function, step_length)
+
+        # Display the original and reconstructed signals in seconds
+        plt.figure(figsize=(14, 5))
+        plt.subplot(2, 1, 1), zaf.sigplot(audio_signal, sampling_frequency, xtick_step=1)
+        plt.ylim(-1, 1), plt.title("Original signal")
+        plt.subplot(2, 1, 2), zaf.sigplot(audio_signal2, sampling_frequency, xtick_step=1)
+        plt.ylim(-1, 1), plt.title("Reconstructed signal")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Get the window length in samples and the number of time frames
+    window_length = len(window_function)
+    number_times = np.shape(audio_spectrogram)[1]
+
+    # Derive the number of samples for the zero-padded signal (as framed by zaf.stft)
+    number_samples = number_times * step_length + (window_length - step_length)
+
+    # Preallocate the signal (with one extra step for the overlap-add) and get the frames as a strided view
+    audio_signal = np.zeros(number_samples + step_length)
+    audio_frames = np.lib.stride_tricks.sliding_window_view(
+        audio_signal[0:number_samples], window_length
+    )[::step_length, :]
+    frame_buffer = np.zeros((number_times, window_length))
+
+    # Precompute the inverse of the overlap-added squared window (least-squares inverse STFT)
+    window_envelope = _overlapadd(
+        np.tile(np.power(window_function, 2), (number_times, 1)),
+        step_length,
+        np.zeros(number_samples + step_length),
+    )
+    window_envelope[window_envelope < np.finfo(float).eps] = np.inf
+    window_envelope = 1 / window_envelope
+
+    # Work time-major so that the FFTs are over contiguous frames, and start from random phases
+    audio_spectrogram = np.ascontiguousarray(audio_spectrogram.T)
+    audio_phases = np.exp(2j * np.pi * np.random.rand(*np.shape(audio_spectrogram)))
+    rebuilt_stft = np.zeros(np.shape(audio_spectrogram), dtype=complex)
+
+    # Derive the momentum factor and the norm of the spectrogram for the spectral convergence
+    momentum_factor = momentum / (1 + momentum)
+    spectrogram_norm = np.linalg.norm(audio_spectrogram) + np.finfo(float).eps
+    spectral_convergences = []
+    _stage("initialization")
+
+    # Loop over the iterations
+    for i in range(number_iterations):
+
+        # Compute the inverse STFT of the spectrogram with the current phases (into the preallocated signal)
+        np.multiply(
+            np.fft.irfft(audio_spectrogram * audio_phases, n=window_length, axis=1),
+            window_function,
+            out=frame_buffer,
+        )
+        _overlapadd(frame_buffer, step_length, audio_signal)
+        audio_signal[0:number_samples] *= window_envelope[0:number_samples]
+
+        # Compute the STFT of the signal, keeping the previous one for the momentum
+        previous_stft = rebuilt_stft
+        np.multiply(audio_frames, window_function, out=frame_buffer)
+        rebuilt_stft = np.fft.rfft(frame_buffer, axis=1)
+
+        # Update the phases with the fast Griffin-Lim momentum
+        audio_phases = rebuilt_stft - momentum_factor * previous_stft
+        audio_phases /= np.absolute(audio_phases) + np.finfo(float).eps
+
+        # Stop early if the spectral convergence did not decrease enough over the last 10 iterations
+        # (it does not decrease monotonically with the momentum)
+        spectral_convergences.append(
+            np.linalg.norm(audio_spectrogram - np.absolute(rebuilt_stft))
+            / spectrogram_norm
+        )
+        if (
+            i >= 10
+            and spectral_convergences[i - 10] - spectral_convergences[i]
+            < tolerance * spectral_convergences[i]
+        ):
+            break
+    _stage("iterations")
+
+    # Compute the final inverse STFT with the last phases
+    np.multiply(
+        np.fft.irfft(audio_spectrogram * audio_phases, n=window_length, axis=1),
+        window_function,
+        out=frame_buffer,
+    )
+    _overlapadd(frame_buffer, step_length, audio_signal)
+    audio_signal[0:number_samples] *= window_envelope[0:number_samples]
+
+    # Remove the zero-padding at the start and at the end of the signal (as added by zaf.stft)
+    padding_length = int(np.floor(window_length / 2))
+    audio_signal = audio_signal[padding_length : number_samples - padding_length]
+    _stage("inverse stft")
 
     return audio_signal
 
 
+@_profile
 def melfilterbank(sampling_frequency, window_length, number_filters):
     """
     Compute the mel filterbank.
@@ -323,7 +902,19 @@ def melfilterbank(sampling_frequency, window_length, number_filters):
     return mel_filterbank
 
 
-def melspectrogram(audio_signal, window_function, step_length, mel_filterbank):
+@_profile
+def melspectrogram(
+    audio_signal,
+    window_function,
+    step_length,
+    mel_filterbank,
+    sampling_frequency=None,
+    target_sampling_frequency=None,
+    silence_threshold=None,
+    quantization=None,
+    dynamic_range=80,
+    layout="frequency_major",
+):
     """
     Compute the mel spectrogram using a mel filterbank.
 
@@ -332,8 +923,21 @@ def melspectrogram(audio_signal, window_function, step_length, mel_filterbank):
         window_function: window function (window_length,)
         step_length: step length in samples
         mel_filterbank: mel filterbank (number_mels, number_frequencies)
-    Output:
-        mel_spectrogram: mel spectrogram (number_mels, number_times)
+        sampling_frequency: sampling frequency in Hz (only needed with target_sampling_frequency) (default: None)
+        target_sampling_frequency: sampling frequency in Hz to resample the signal to before the framing
+            (the window function, step length, and mel filterbank are then for the target sampling frequency) (default: None, i.e., no resampling)
+        silence_threshold: RMS in dB under which the time frames are not transformed and set to 0 (default: None, i.e., no gating)
+        quantization: "float16", "uint8", or "uint16" to return the mel spectrogram in dB quantized to this type,
+            with the scale and offset to dequantize it (see zaf.dequantize) (default: None, i.e., float64 magnitudes)
+        dynamic_range: range in dB under the maximum kept by the quantization (lower values are clipped) (default: 80)
+        layout: "frequency_major" or "time_major" (the time frames are then computed and stored contiguously,
+            row by row) (default: "frequency_major")
+    Outputs:
+        mel_spectrogram: mel spectrogram (number_mels, number_times) (or (number_times, number_mels) if time-major)
+        output_info: extra outputs, only if silence_threshold or quantization is given (the output is then
+            (mel_spectrogram, output_info)) {"silence_mask": mask of the time frames under the silence threshold
+            (number_times,) (if silence_threshold is given), "feature_scale": scale in dB of the quantized values,
+            "feature_offset": offset in dB of the quantized values (if quantization is given)}
 
     Example: Compute and display the mel spectrogram.
         # Import the needed modules
@@ -368,34 +972,80 @@ def melspectrogram(audio_signal, window_function, step_length, mel_filterbank):
     """
 
     # Compute the magnitude spectrogram (without the DC component and the mirrored frequencies)
-    audio_stft = stft(audio_signal, window_function, step_length)
-    audio_spectrogram = abs(audio_stft[1 : int(len(window_function) / 2) + 1, :])
-
-    # Compute the mel spectrogram by using the filterbank
-    mel_spectrogram = np.matmul(mel_filterbank.toarray(), audio_spectrogram)
-
+    # and the mask of the silent time frames (all of them are computed if no silence threshold)
+    audio_stft = stft(
+        audio_signal,
+        window_function,
+        step_length,
+        sampling_frequency,
+        target_sampling_frequency,
+        silence_threshold=silence_threshold,
+        layout=layout,
+    )
+    if silence_threshold is None:
+        silence_mask = np.zeros(
+            np.shape(audio_stft)[0 if layout == "time_major" else 1], dtype=bool
+        )
+    else:
+        audio_stft, output_info = audio_stft
+        silence_mask = output_info["silence_mask"]
+    time_indices = np.flatnonzero(np.logical_not(silence_mask))
+    number_frequencies = int(len(window_function) / 2)
+    _stage("stft")
+
+    # Compute the mel spectrogram by using the filterbank (the silent time frames stay at 0)
+    if layout == "time_major":
+        audio_spectrogram = abs(audio_stft[time_indices, 1 : number_frequencies + 1])
+        mel_spectrogram = np.zeros((len(silence_mask), np.shape(mel_filterbank)[0]))
+        mel_spectrogram[time_indices, :] = np.matmul(
+            audio_spectrogram, mel_filterbank.toarray().T
+        )
+    else:
+        audio_spectrogram = abs(audio_stft[1 : number_frequencies + 1, time_indices])
+        mel_spectrogram = np.zeros((np.shape(mel_filterbank)[0], len(silence_mask)))
+        mel_spectrogram[:, time_indices] = np.matmul(
+            mel_filterbank.toarray(), audio_spectrogram
+        )
+    _stage("filterbank")
+
+    # Gather the extra outputs: the silence mask (if gating), and the scale and offset of the mel spectrogram
+    # converted to dB and quantized (if required)
+    output_info = {}
+    if silence_threshold is not None:
+        output_info["silence_mask"] = silence_mask
+    if quantization is not None:
+        (
+            mel_spectrogram,
+            output_info["feature_scale"],
+            output_info["feature_offset"],
+        ) = _quantize(mel_spectrogram, quantization, dynamic_range)
+        _stage("quantization")
+
+    if output_info:
+        return mel_spectrogram, output_info
     return mel_spectrogram
 
 
-def mfcc(
-    audio_signal, window_function, step_length, mel_filterbank, number_coefficients
+@_profile
+def multimelspectrogram(
+    audio_signal, sampling_frequency, window_lengths, step_length, number_mels
 ):
     """
-    Compute the mel-frequency cepstral coefficients (MFCCs) using a mel filterbank.
+    Compute mel spectrograms at several window lengths, sharing the zero-padding and the framing of the signal.
 
     Inputs:
         audio_signal: audio signal (number_samples,)
-        window_function: window function (window_length,)
-        step_length: step length in samples
-        mel_filterbank: mel filterbank (number_mels, number_frequencies)
-        number_coefficients: number of coefficients (without the 0th coefficient)
+        sampling_frequency: sampling frequency in Hz
+        window_lengths: window lengths in samples (one per resolution, with a periodic Hamming window)
+        step_length: step length in samples (the same for all the resolutions, so that the time frames are aligned)
+        number_mels: number of mel filters
     Output:
-        audio_mfcc: audio MFCCs (number_coefficients, number_times)
+        mel_spectrograms: mel spectrograms (the same as zaf.melspectrogram at every resolution, with centered
+            windows) [(number_mels, number_times), ...]
 
-    Example: Compute and display the MFCCs, delta MFCCs, and delta-delta MFCCs.
+    Example: Compute and display the mel spectrograms with windows of about 25, 50, and 100 ms.
         # Import the needed modules
         import numpy as np
-        import scipy.signal
         import zaf
         import matplotlib.pyplot as plt
 
@@ -403,63 +1053,475 @@ def mfcc(
         audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
         audio_signal = np.mean(audio_signal, 1)
 
-        # Set the parameters for the Fourier analysis
-        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
-        window_function = scipy.signal.hamming(window_length, sym=False)
-        step_length = int(window_length/2)
-
-        # Compute the mel filterbank
-        number_mels = 40
-        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, number_mels)
+        # Set the window lengths in samples (powers of 2) and the common step length in samples (10 ms)
+        window_lengths = [pow(2, int(np.ceil(np.log2(window_duration*sampling_frequency))))
+                          for window_duration in [0.025, 0.05, 0.1]]
+        step_length = int(0.01*sampling_frequency)
 
-        # Compute the MFCCs using the filterbank
-        number_coefficients = 20
-        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, number_coefficients)
-
-        # Compute the delta and delta-delta MFCCs
-        audio_dmfcc = np.diff(audio_mfcc, n=1, axis=1)
-        audio_ddmfcc = np.diff(audio_dmfcc, n=1, axis=1)
+        # Compute the mel spectrograms with 64 mel filters
+        mel_spectrograms = zaf.multimelspectrogram(audio_signal, sampling_frequency, window_lengths, step_length, 64)
 
-        # Display the MFCCs, delta MFCCs, and delta-delta MFCCs in seconds
+        # Display the mel spectrograms in dB, seconds, and Hz
         number_samples = len(audio_signal)
-        xtick_step = 1
         plt.figure(figsize=(14, 7))
-        plt.subplot(3, 1, 1)
-        zaf.mfccshow(audio_mfcc, number_samples, sampling_frequency, xtick_step), plt.title("MFCCs")
-        plt.subplot(3, 1, 2)
-        zaf.mfccshow(audio_dmfcc, number_samples, sampling_frequency, xtick_step), plt.title("Delta MFCCs")
-        plt.subplot(3, 1, 3)
-        zaf.mfccshow(audio_ddmfcc, number_samples, sampling_frequency, xtick_step), plt.title("Delta-delta MFCCs")
+        for i in range(len(window_lengths)):
+            plt.subplot(len(window_lengths), 1, i+1)
+            zaf.melspecshow(mel_spectrograms[i], number_samples, sampling_frequency, window_lengths[i], xtick_step=1)
+            plt.title(f"Mel spectrogram with a window of {window_lengths[i]} samples (dB)")
         plt.tight_layout()
         plt.show()
     """
 
-    # Compute the power spectrogram (without the DC component and the mirrored frequencies)
-    audio_stft = stft(audio_signal, window_function, step_length)
-    audio_spectrogram = np.power(
-        abs(audio_stft[1 : int(len(window_function) / 2) + 1, :]), 2
-    )
+    # Get the number of samples and derive the zero-padding lengths at the start of the signal (as in zaf.stft)
+    number_samples = len(audio_signal)
+    padding_lengths = [
+        int(np.floor(window_length / 2)) for window_length in window_lengths
+    ]
 
-    # Compute the discrete cosine transform of the log magnitude spectrogram
-    # mapped onto the mel scale using the filter bank
-    audio_mfcc = scipy.fftpack.dct(
-        np.log(
-            np.matmul(mel_filterbank.toarray(), audio_spectrogram) + np.finfo(float).eps
-        ),
-        axis=0,
-        norm="ortho",
+    # Compute the number of time frames for every resolution (as in zaf.stft)
+    number_times = [
+        int(
+            np.ceil(
+                ((number_samples + 2 * padding_length) - window_length) / step_length
+            )
+        )
+        + 1
+        for window_length, padding_length in zip(window_lengths, padding_lengths)
+    ]
+
+    # Zero-pad the signal once, for the largest padding at the start and the largest frames at the end
+    # (the frames of a resolution then start at the difference with its own padding)
+    start_padding = max(padding_lengths)
+    end_index = max(
+        start_padding - padding_length + (number_time - 1) * step_length + window_length
+        for window_length, padding_length, number_time in zip(
+            window_lengths, padding_lengths, number_times
+        )
+    )
+    audio_signal = np.pad(
+        audio_signal,
+        (start_padding, max(end_index - start_padding - number_samples, 0)),
+        "constant",
+        constant_values=0,
     )
+    _stage("padding")
 
-    # Keep only the first coefficients (without the 0th)
-    audio_mfcc = audio_mfcc[1 : number_coefficients + 1, :]
+    # Initialize the mel spectrograms
+    mel_spectrograms = []
 
-    return audio_mfcc
+    # Loop over the resolutions
+    for window_length, padding_length, number_time in zip(
+        window_lengths, padding_lengths, number_times
+    ):
 
+        # Get the window function and the mel filterbank (computed once per resolution)
+        window_function, mel_filterbank = _multimelsetup(
+            sampling_frequency, window_length, number_mels
+        )
 
-def cqtkernel(
-    sampling_frequency, octave_resolution, minimum_frequency, maximum_frequency
-):
-    """
+        # Frame the shared signal (strided view, centered as in zaf.stft)
+        audio_frames = np.lib.stride_tricks.sliding_window_view(
+            audio_signal[start_padding - padding_length :], window_length
+        )[::step_length, :][0:number_time, :]
+
+        # Compute the magnitude spectrogram using the real FFT (without the DC component)
+        audio_spectrogram = np.absolute(
+            np.fft.rfft(audio_frames * window_function, axis=1)[
+                :, 1 : int(window_length / 2) + 1
+            ]
+        )
+
+        # Compute the mel spectrogram by using the filterbank
+        mel_spectrograms.append(np.matmul(mel_filterbank, audio_spectrogram.T))
+        _stage(f"resolution {window_length}")
+
+    return mel_spectrograms
+
+
+@_profile
+def melspectrogramupdate(
+    mel_spectrogram,
+    audio_signal,
+    window_function,
+    step_length,
+    mel_filterbank,
+    start_index,
+    end_index,
+    layout="frequency_major",
+):
+    """
+    Update the mel spectrogram after an edit of the signal (in place).
+
+    Inputs:
+        mel_spectrogram: mel spectrogram of the signal before the edit (number_mels, number_times)
+        audio_signal: audio signal after the edit (same number of samples) (number_samples,)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        mel_filterbank: mel filterbank (number_mels, number_frequencies)
+        start_index: index of the first edited sample
+        end_index: index of the last edited sample (excluded)
+        layout: layout of the mel spectrogram, "frequency_major" or "time_major" (as given to zaf.melspectrogram)
+            (default: "frequency_major")
+    Output:
+        mel_spectrogram: mel spectrogram of the signal after the edit (the same array) (number_mels, number_times)
+            (or (number_times, number_mels) if time-major)
+
+    Example: Mute two seconds of an audio file and update its mel spectrogram.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the mel spectrogram
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 128)
+        mel_spectrogram = zaf.melspectrogram(audio_signal, window_function, step_length, mel_filterbank)
+
+        # Mute the signal between 2 and 4 seconds
+        start_index = 2*sampling_frequency
+        end_index = 4*sampling_frequency
+        audio_signal[start_index:end_index] = 0
+
+        # Update the mel spectrogram (only the time frames overlapping the edit are recomputed)
+        mel_spectrogram = zaf.melspectrogramupdate(mel_spectrogram, audio_signal, window_function, step_length,
+                                                   mel_filterbank, start_index, end_index)
+
+        # Display the updated mel spectrogram in dB, seconds, and Hz
+        plt.figure(figsize=(14, 5))
+        zaf.melspecshow(mel_spectrogram, len(audio_signal), sampling_frequency, window_length, xtick_step=1)
+        plt.title("Mel spectrogram after the edit (dB)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Check the layout of the mel spectrogram
+    _checklayout(layout)
+
+    # Get the window length in samples and derive the zero-padding length at the start (as in zaf.stft)
+    window_length = len(window_function)
+    padding_length = int(np.floor(window_length / 2))
+
+    # Derive the time frames whose windows overlap the edit
+    start_time, end_time = _editframes(
+        np.shape(mel_spectrogram)[0 if layout == "time_major" else 1],
+        window_length,
+        step_length,
+        padding_length,
+        start_index,
+        end_index,
+    )
+
+    # Recompute the magnitude spectrogram of these time frames only (without the DC component and the mirrored frequencies)
+    audio_frames = _segmentframes(
+        audio_signal, window_length, step_length, padding_length, start_time, end_time
+    )
+    audio_spectrogram = abs(
+        np.fft.fft(audio_frames * window_function, axis=1)[
+            :, 1 : int(window_length / 2) + 1
+        ].T
+    )
+    _stage("stft")
+
+    # Recompute the mel spectrogram of these time frames by using the filterbank
+    if layout == "time_major":
+        mel_spectrogram[start_time:end_time, :] = np.matmul(
+            audio_spectrogram.T, mel_filterbank.toarray().T
+        )
+    else:
+        mel_spectrogram[:, start_time:end_time] = np.matmul(
+            mel_filterbank.toarray(), audio_spectrogram
+        )
+    _stage("filterbank")
+
+    return mel_spectrogram
+
+
+@_profile
+def mfcc(
+    audio_signal,
+    window_function,
+    step_length,
+    mel_filterbank,
+    number_coefficients,
+    sampling_frequency=None,
+    target_sampling_frequency=None,
+    silence_threshold=None,
+    layout="frequency_major",
+):
+    """
+    Compute the mel-frequency cepstral coefficients (MFCCs) using a mel filterbank.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        mel_filterbank: mel filterbank (number_mels, number_frequencies)
+        number_coefficients: number of coefficients (without the 0th coefficient)
+        sampling_frequency: sampling frequency in Hz (only needed with target_sampling_frequency) (default: None)
+        target_sampling_frequency: sampling frequency in Hz to resample the signal to before the framing
+            (the window function, step length, and mel filterbank are then for the target sampling frequency) (default: None, i.e., no resampling)
+        silence_threshold: RMS in dB under which the time frames are not transformed and set to 0 (as for digital silence) (default: None, i.e., no gating)
+        layout: "frequency_major" or "time_major" (the time frames are then computed and stored contiguously,
+            row by row) (default: "frequency_major")
+    Outputs:
+        audio_mfcc: audio MFCCs (number_coefficients, number_times) (or (number_times, number_coefficients) if time-major)
+        output_info: extra outputs, only if silence_threshold is given (the output is then (audio_mfcc, output_info))
+            {"silence_mask": mask of the time frames under the silence threshold (number_times,)}
+
+    Example: Compute and display the MFCCs, delta MFCCs, and delta-delta MFCCs.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Set the parameters for the Fourier analysis
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+
+        # Compute the mel filterbank
+        number_mels = 40
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, number_mels)
+
+        # Compute the MFCCs using the filterbank
+        number_coefficients = 20
+        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, number_coefficients)
+
+        # Compute the delta and delta-delta MFCCs
+        audio_dmfcc = np.diff(audio_mfcc, n=1, axis=1)
+        audio_ddmfcc = np.diff(audio_dmfcc, n=1, axis=1)
+
+        # Display the MFCCs, delta MFCCs, and delta-delta MFCCs in seconds
+        number_samples = len(audio_signal)
+        xtick_step = 1
+        plt.figure(figsize=(14, 7))
+        plt.subplot(3, 1, 1)
+        zaf.mfccshow(audio_mfcc, number_samples, sampling_frequency, xtick_step), plt.title("MFCCs")
+        plt.subplot(3, 1, 2)
+        zaf.mfccshow(audio_dmfcc, number_samples, sampling_frequency, xtick_step), plt.title("Delta MFCCs")
+        plt.subplot(3, 1, 3)
+        zaf.mfccshow(audio_ddmfcc, number_samples, sampling_frequency, xtick_step), plt.title("Delta-delta MFCCs")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Compute the power spectrogram (without the DC component and the mirrored frequencies)
+    # and the mask of the silent time frames (all of them are computed if no silence threshold)
+    audio_stft = stft(
+        audio_signal,
+        window_function,
+        step_length,
+        sampling_frequency,
+        target_sampling_frequency,
+        silence_threshold=silence_threshold,
+        layout=layout,
+    )
+    if silence_threshold is None:
+        silence_mask = np.zeros(
+            np.shape(audio_stft)[0 if layout == "time_major" else 1], dtype=bool
+        )
+    else:
+        audio_stft, output_info = audio_stft
+        silence_mask = output_info["silence_mask"]
+    time_indices = np.flatnonzero(np.logical_not(silence_mask))
+    number_frequencies = int(len(window_function) / 2)
+    if layout == "time_major":
+        audio_spectrogram = np.power(
+            abs(audio_stft[time_indices, 1 : number_frequencies + 1]), 2
+        )
+    else:
+        audio_spectrogram = np.power(
+            abs(audio_stft[1 : number_frequencies + 1, time_indices]), 2
+        )
+    _stage("stft")
+
+    # Map the power spectrogram onto the mel scale using the filter bank
+    if layout == "time_major":
+        mel_spectrogram = np.matmul(audio_spectrogram, mel_filterbank.toarray().T)
+    else:
+        mel_spectrogram = np.matmul(mel_filterbank.toarray(), audio_spectrogram)
+    _stage("filterbank")
+
+    # Compute the log of the mel spectrogram
+    mel_spectrogram = np.log(mel_spectrogram + np.finfo(float).eps)
+    _stage("log")
+
+    # Compute the discrete cosine transform of the log mel spectrogram (along the mels)
+    mel_axis = 1 if layout == "time_major" else 0
+    audio_mfcc = scipy.fftpack.dct(mel_spectrogram, axis=mel_axis, norm="ortho")
+    _stage("dct")
+
+    # Keep only the first coefficients (without the 0th), contiguous
+    if layout == "time_major":
+        audio_mfcc = np.ascontiguousarray(audio_mfcc[:, 1 : number_coefficients + 1])
+    else:
+        audio_mfcc = audio_mfcc[1 : number_coefficients + 1, :]
+
+    # Put back the silent time frames at 0 (as the DCT of a constant log mel spectrum) if gating
+    if silence_threshold is not None:
+        if layout == "time_major":
+            gated_mfcc = np.zeros((len(silence_mask), np.shape(audio_mfcc)[1]))
+            gated_mfcc[time_indices, :] = audio_mfcc
+        else:
+            gated_mfcc = np.zeros((np.shape(audio_mfcc)[0], len(silence_mask)))
+            gated_mfcc[:, time_indices] = audio_mfcc
+        return gated_mfcc, {"silence_mask": silence_mask}
+
+    return audio_mfcc
+
+
+@_profile
+def extract(
+    audio_signal,
+    features,
+    window_function,
+    step_length,
+    mel_filterbank=None,
+    number_coefficients=None,
+):
+    """
+    Extract several features in a single pass, computing their shared intermediates only once.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        features: names of the features to extract, among "stft" (as zaf.stft), "spectrogram" (magnitude,
+            without DC and mirrored frequencies), "powerspectrogram", "melspectrogram" (as zaf.melspectrogram),
+            and "mfcc" (as zaf.mfcc)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        mel_filterbank: mel filterbank (number_mels, number_frequencies) (for "melspectrogram" and "mfcc")
+        number_coefficients: number of coefficients (without the 0th coefficient) (for "mfcc")
+    Output:
+        audio_features: dictionary of the extracted features {feature: array}
+
+    Example: Extract the spectrogram, mel spectrogram, and MFCCs with one STFT.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Set the parameters for the Fourier analysis and compute the mel filterbank
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 40)
+
+        # Extract the features
+        audio_features = zaf.extract(audio_signal, ["spectrogram", "melspectrogram", "mfcc"], window_function,
+                                     step_length, mel_filterbank=mel_filterbank, number_coefficients=20)
+
+        # Display the spectrogram, the mel spectrogram, and the MFCCs
+        number_samples = len(audio_signal)
+        plt.figure(figsize=(14, 7))
+        plt.subplot(3, 1, 1)
+        zaf.specshow(audio_features["spectrogram"], number_samples, sampling_frequency, xtick_step=1, ytick_step=1000)
+        plt.title("Spectrogram (dB)")
+        plt.subplot(3, 1, 2)
+        zaf.melspecshow(audio_features["melspectrogram"], number_samples, sampling_frequency, window_length, xtick_step=1)
+        plt.title("Mel spectrogram (dB)")
+        plt.subplot(3, 1, 3)
+        zaf.mfccshow(audio_features["mfcc"], number_samples, sampling_frequency, xtick_step=1)
+        plt.title("MFCCs")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Derive the number of frequencies (without the DC component and the mirrored frequencies)
+    number_frequencies = int(len(window_function) / 2)
+
+    # Define the dependency graph of the features and of their intermediates
+    # (name: (names of the dependencies, function computing the feature from the dependencies))
+    feature_graph = {
+        "stft": ((), lambda: stft(audio_signal, window_function, step_length)),
+        "spectrogram": (
+            ("stft",),
+            lambda audio_stft: abs(audio_stft[1 : number_frequencies + 1, :]),
+        ),
+        "powerspectrogram": (
+            ("spectrogram",),
+            lambda audio_spectrogram: np.power(audio_spectrogram, 2),
+        ),
+        "melfilterbank": ((), lambda: mel_filterbank.toarray()),
+        "melspectrogram": (
+            ("melfilterbank", "spectrogram"),
+            np.matmul,
+        ),
+        "melpowerspectrogram": (
+            ("melfilterbank", "powerspectrogram"),
+            np.matmul,
+        ),
+        "mfcc": (
+            ("melpowerspectrogram",),
+            lambda mel_spectrogram: scipy.fftpack.dct(
+                np.log(mel_spectrogram + np.finfo(float).eps), axis=0, norm="ortho"
+            )[1 : number_coefficients + 1, :],
+        ),
+    }
+
+    # Check the features and their parameters
+    for feature_name in features:
+        if feature_name not in (
+            "stft",
+            "spectrogram",
+            "powerspectrogram",
+            "melspectrogram",
+            "mfcc",
+        ):
+            raise ValueError(f"Unknown feature {feature_name!r}.")
+        if feature_name in ("melspectrogram", "mfcc") and mel_filterbank is None:
+            raise ValueError(f"The feature {feature_name!r} needs a mel filterbank.")
+        if feature_name == "mfcc" and number_coefficients is None:
+            raise ValueError("The feature 'mfcc' needs a number of coefficients.")
+
+    # Compute the features recursively from their dependencies, computing every node of the graph once
+    feature_values = {}
+
+    def compute_feature(feature_name):
+        if feature_name not in feature_values:
+            dependency_names, feature_function = feature_graph[feature_name]
+            feature_values[feature_name] = feature_function(
+                *[
+                    compute_feature(dependency_name)
+                    for dependency_name in dependency_names
+                ]
+            )
+            _stage(feature_name)
+        return feature_values[feature_name]
+
+    audio_features = {
+        feature_name: compute_feature(feature_name) for feature_name in features
+    }
+
+    return audio_features
+
+
+@_profile
+def cqtkernel(
+    sampling_frequency,
+    octave_resolution,
+    minimum_frequency,
+    maximum_frequency,
+    sparsity_threshold=0.01,
+    number_nonzeros=None,
+):
+    """
     Compute the constant-Q transform (CQT) kernel.
 
     Inputs:
@@ -467,6 +1529,10 @@ def cqtkernel(
         octave_resolution: number of frequency channels per octave
         minimum_frequency: minimum frequency in Hz
         maximum_frequency: maximum frequency in Hz
+        sparsity_threshold: magnitude below which the spectral kernels are zeroed (0 for a dense kernel)
+            (default: 0.01)
+        number_nonzeros: number of largest magnitudes to keep instead of using a threshold (about, with ties)
+            (default: None, i.e., using the sparsity threshold)
     Output:
         cqt_kernel: CQT kernel (sparse) (number_frequencies, fft_length)
 
@@ -544,24 +1610,203 @@ def cqtkernel(
         # Save the current temporal kernel at the center
         # (the zero-padded temporal kernels are not perfectly symmetric anymore because of the even length here)
         cqt_kernel[i, pad_width : pad_width + window_length] = temporal_kernel
+    _stage("temporal kernels")
 
     # Derive the spectral kernels by taking the FFT of the temporal kernels
     # (the spectral kernels are almost real because the temporal kernels are almost symmetric)
     cqt_kernel = np.fft.fft(cqt_kernel, axis=1)
+    _stage("fft")
+
+    # Derive the threshold from the number of nonzeros to keep (the magnitude of the largest value zeroed), if given
+    kernel_magnitudes = np.absolute(cqt_kernel)
+    if number_nonzeros is not None:
+        number_zeros = np.size(kernel_magnitudes) - number_nonzeros
+        sparsity_threshold = (
+            np.partition(kernel_magnitudes, number_zeros - 1, axis=None)[
+                number_zeros - 1
+            ]
+            if number_zeros > 0
+            else 0
+        )
+        kernel_magnitudes[kernel_magnitudes == sparsity_threshold] = 0
 
-    # Make the CQT kernel sparser by zeroing magnitudes below a threshold
-    cqt_kernel[np.absolute(cqt_kernel) < 0.01] = 0
+    # Make the CQT kernel sparser by zeroing magnitudes below the threshold
+    cqt_kernel[kernel_magnitudes < sparsity_threshold] = 0
 
     # Make the CQT kernel sparse by saving it as a compressed sparse row matrix
     cqt_kernel = scipy.sparse.csr_matrix(cqt_kernel)
 
     # Get the final CQT kernel by using Parseval's theorem
     cqt_kernel = np.conjugate(cqt_kernel) / fft_length
+    _stage("sparsification")
 
     return cqt_kernel
 
 
-def cqtspectrogram(audio_signal, sampling_frequency, time_resolution, cqt_kernel):
+@_profile
+def cqtkernelreport(cqt_kernel, dense_kernel):
+    """
+    Report the cost and the accuracy of a sparse CQT kernel compared with the dense kernel.
+
+    Inputs:
+        cqt_kernel: CQT kernel (sparse) (number_frequencies, fft_length)
+        dense_kernel: dense CQT kernel (computed with a sparsity threshold of 0) (number_frequencies, fft_length)
+    Output:
+        kernel_report: {"number_nonzeros": number of nonzeros, "density": fraction of nonzeros,
+            "kernel_flops": real floating-point operations per time frame for the (complex) kernel product,
+            "fft_flops": estimated real floating-point operations per time frame for the FFT,
+            "kernel_error": relative Frobenius error of the kernel,
+            "maximum_error": largest relative error of the frequency channels}
+            (for a white noise, the relative error of a CQT frequency channel is the one of its kernel)
+
+    Example: Find the sparsest CQT kernel with an error below 1%.
+        # Import the needed modules
+        import numpy as np
+        import zaf
+
+        # Compute the dense CQT kernel
+        sampling_frequency = 44100
+        dense_kernel = zaf.cqtkernel(sampling_frequency, 24, 55, 3520, sparsity_threshold=0)
+
+        # Report the number of nonzeros, the number of operations, and the error for several thresholds
+        for sparsity_threshold in [0.001, 0.003, 0.01, 0.03, 0.1]:
+            cqt_kernel = zaf.cqtkernel(sampling_frequency, 24, 55, 3520, sparsity_threshold)
+            kernel_report = zaf.cqtkernelreport(cqt_kernel, dense_kernel)
+            print(sparsity_threshold, kernel_report)
+            if kernel_report["maximum_error"] > 0.01:
+                break
+    """
+
+    # Count the nonzeros (a complex multiply-add is 8 real operations) and estimate the FFT cost (5 N log2 N)
+    number_frequencies, fft_length = np.shape(cqt_kernel)
+    number_nonzeros = scipy.sparse.csr_matrix(cqt_kernel).count_nonzero()
+    _stage("count")
+
+    # Compute the error of the kernel and of its frequency channels (rows) against the dense kernel
+    dense_kernel = scipy.sparse.csr_matrix(dense_kernel)
+    error_kernel = scipy.sparse.csr_matrix(cqt_kernel) - dense_kernel
+    error_norms = np.sqrt(
+        np.asarray(np.absolute(error_kernel).power(2).sum(axis=1)).ravel()
+    )
+    dense_norms = np.sqrt(
+        np.asarray(np.absolute(dense_kernel).power(2).sum(axis=1)).ravel()
+    )
+    _stage("error")
+
+    kernel_report = {
+        "number_nonzeros": int(number_nonzeros),
+        "density": float(number_nonzeros / (number_frequencies * fft_length)),
+        "kernel_flops": 8 * int(number_nonzeros),
+        "fft_flops": int(5 * fft_length * np.log2(fft_length)),
+        "kernel_error": float(np.sqrt(np.sum(error_norms**2) / np.sum(dense_norms**2))),
+        "maximum_error": float(np.max(error_norms / dense_norms)),
+    }
+
+    return kernel_report
+
+
+@_profile
+def cqtfilterbank(
+    sampling_frequency,
+    window_length,
+    octave_resolution,
+    minimum_frequency,
+    maximum_frequency,
+):
+    """
+    Compute a constant-Q transform (CQT) filterbank mapping an STFT onto log-spaced frequency channels.
+
+    Inputs:
+        sampling_frequency: sampling frequency in Hz
+        window_length: window length for the Fourier analysis in samples (even)
+        octave_resolution: number of frequency channels per octave
+        minimum_frequency: minimum frequency in Hz
+        maximum_frequency: maximum frequency in Hz
+    Output:
+        cqt_filterbank: CQT filterbank (sparse) (number_frequencies, window_length/2+1), i.e., triangular filters
+            centered on the frequencies of the CQT channels, to give to zaf.cqtspectrogram or zaf.cqtchromagram
+            instead of a CQT kernel for an approximate CQT from the power of an STFT (with a periodic Hamming window);
+            this is much faster, but with the frequency resolution of the STFT (below about
+            sampling_frequency/(window_length*(2^(1/octave_resolution)-1)) Hz, e.g., 368 Hz for 44100 Hz, 4096 samples,
+            and 24 channels per octave, the channels are interpolated from the same FFT bins) and the same time
+            resolution for all the channels, with magnitudes of pure tones about 1.3 dB (at most 3 dB) under the ones
+            of the CQT kernel
+
+    Example: Compute and display a CQT filterbank.
+        # Import the needed modules
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Compute the CQT filterbank using some parameters
+        sampling_frequency = 44100
+        window_length = 4096
+        octave_resolution = 24
+        minimum_frequency = 55
+        maximum_frequency = 3520
+        cqt_filterbank = zaf.cqtfilterbank(sampling_frequency, window_length, octave_resolution, minimum_frequency, maximum_frequency)
+
+        # Display the CQT filterbank
+        plt.figure(figsize=(14, 5))
+        plt.imshow(cqt_filterbank.toarray(), aspect="auto", cmap="jet", origin="lower")
+        plt.title("CQT filterbank")
+        plt.xlabel("Frequency index")
+        plt.ylabel("CQT index")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Compute the number of frequency channels for the CQT and their frequency values in Hz (log spaced)
+    number_frequencies = round(
+        octave_resolution * np.log2(maximum_frequency / minimum_frequency)
+    )
+    frequency_values = minimum_frequency * np.power(
+        2, np.arange(number_frequencies) / octave_resolution
+    )
+
+    # Derive the half-widths of the triangular filters in Hz (the spacing of the CQT channels, but at least the
+    # spacing of the FFT bins, so that the narrower channels interpolate between bins instead of missing them)
+    filter_widths = np.maximum(
+        frequency_values * (pow(2, 1 / octave_resolution) - 1),
+        sampling_frequency / window_length,
+    )
+
+    # Compute the triangular filters over the frequencies of the FFT bins (from 0 to the Nyquist frequency)
+    fft_frequencies = np.arange(int(window_length / 2) + 1) * (
+        sampling_frequency / window_length
+    )
+    cqt_filterbank = np.maximum(
+        1
+        - np.absolute(fft_frequencies - frequency_values[:, np.newaxis])
+        / filter_widths[:, np.newaxis],
+        0,
+    )
+
+    # Normalize the filters for the power of a periodic Hamming window, so that the magnitudes of the tones are about
+    # the ones of the CQT kernel (which are 0.54 times their amplitudes over 2)
+    window_function = scipy.signal.windows.hamming(window_length, sym=False)
+    cqt_filterbank = cqt_filterbank * (
+        pow(0.54, 2) / (window_length * np.sum(np.square(window_function)))
+    )
+
+    # Make the CQT filterbank sparse by saving it as a compressed sparse row matrix
+    cqt_filterbank = scipy.sparse.csr_matrix(cqt_filterbank)
+
+    return cqt_filterbank
+
+
+@_profile
+def cqtspectrogram(
+    audio_signal,
+    sampling_frequency,
+    time_resolution,
+    cqt_kernel,
+    target_sampling_frequency=None,
+    workers=1,
+    silence_threshold=None,
+    quantization=None,
+    dynamic_range=80,
+    layout="frequency_major",
+):
     """
     Compute the constant-Q transform (CQT) spectrogram using a CQT kernel.
 
@@ -569,9 +1814,24 @@ def cqtspectrogram(audio_signal, sampling_frequency, time_resolution, cqt_kernel
         audio_signal: audio signal (number_samples,)
         sampling_frequency: sampling frequency in Hz
         time_resolution: number of time frames per second
-        cqt_kernel: CQT kernel (number_frequencies, fft_length)
-    Output:
+        cqt_kernel: CQT kernel (number_frequencies, fft_length), or CQT filterbank (number_frequencies, window_length/2+1)
+            for an approximate CQT mapped from an STFT (faster, see zaf.cqtfilterbank)
+        target_sampling_frequency: sampling frequency in Hz to resample the signal to before the framing
+            (the CQT kernel is then for the target sampling frequency) (default: None, i.e., no resampling)
+        workers: number of threads computing contiguous chunks of time frames in parallel (default: 1)
+        silence_threshold: RMS in dB under which the time frames are not transformed and set to 0 (default: None, i.e., no gating)
+        quantization: "float16", "uint8", or "uint16" to return the CQT spectrogram in dB quantized to this type,
+            with the scale and offset to dequantize it (see zaf.dequantize) (default: None, i.e., float64 magnitudes)
+        dynamic_range: range in dB under the maximum kept by the quantization (lower values are clipped) (default: 80)
+        layout: "frequency_major" or "time_major" (the time frames are then computed and stored contiguously,
+            row by row) (default: "frequency_major")
+    Outputs:
         cqt_spectrogram: CQT spectrogram (number_frequencies, number_times)
+            (or (number_times, number_frequencies) if time-major)
+        output_info: extra outputs, only if silence_threshold or quantization is given (the output is then
+            (cqt_spectrogram, output_info)) {"silence_mask": mask of the time frames under the silence threshold
+            (number_times,) (if silence_threshold is given), "feature_scale": scale in dB of the quantized values,
+            "feature_offset": offset in dB of the quantized values (if quantization is given)}
 
     Example: Compute and display the CQT spectrogram.
         # Import the modules
@@ -601,6 +1861,17 @@ def cqtspectrogram(audio_signal, sampling_frequency, time_resolution, cqt_kernel
         plt.show()
     """
 
+    # Check the layout of the output
+    _checklayout(layout)
+
+    # Resample the signal before the framing if a target sampling frequency is given
+    if target_sampling_frequency is not None:
+        audio_signal = resample(
+            audio_signal, sampling_frequency, target_sampling_frequency
+        )
+        sampling_frequency = target_sampling_frequency
+        _stage("resampling")
+
     # Derive the number of time samples per time frame
     step_length = round(sampling_frequency / time_resolution)
 
@@ -610,6 +1881,12 @@ def cqtspectrogram(audio_signal, sampling_frequency, time_resolution, cqt_kernel
     # Get th number of frequency channels and the FFT length
     number_frequencies, fft_length = np.shape(cqt_kernel)
 
+    # Derive the FFT length and the window of the approximate CQT if the kernel is a (real) CQT filterbank
+    approximate = cqt_kernel.dtype.kind != "c"
+    if approximate:
+        fft_length = 2 * (fft_length - 1)
+        window_function = scipy.signal.windows.hamming(fft_length, sym=False)
+
     # Zero-pad the signal to center the CQT
     audio_signal = np.pad(
         audio_signal,
@@ -620,25 +1897,105 @@ def cqtspectrogram(audio_signal, sampling_frequency, time_resolution, cqt_kernel
         "constant",
         constant_values=(0, 0),
     )
+    _stage("padding")
+
+    # Initialize the CQT spectrogram, and get its time frames as rows (contiguous if time-major)
+    if layout == "time_major":
+        cqt_spectrogram = np.zeros((number_times, number_frequencies))
+        cqt_frames = cqt_spectrogram
+    else:
+        cqt_spectrogram = np.zeros((number_frequencies, number_times))
+        cqt_frames = cqt_spectrogram.T
+
+    # Derive the time frames to compute, without the ones under the silence threshold (if given)
+    if silence_threshold is None:
+        time_indices = np.arange(number_times)
+    else:
+        silence_mask = _framerms(
+            audio_signal, fft_length, step_length, number_times
+        ) < pow(10, silence_threshold / 20)
+        time_indices = np.flatnonzero(np.logical_not(silence_mask))
+        _stage("gating")
+
+    # Compute the CQT spectrogram of the time frames by contiguous chunks
+    # (in parallel threads if more than one worker, and always for the approximate CQT)
+    if workers > 1 or silence_threshold is not None or approximate:
+        audio_frames = np.lib.stride_tricks.sliding_window_view(
+            audio_signal, fft_length
+        )[::step_length, :]
+
+        def compute_chunk(start_index, end_index):
+            chunk_indices = time_indices[start_index:end_index]
+            if approximate:
+                # Map the power spectrogram onto the log-frequency channels using the filterbank
+                audio_spectrogram = np.square(
+                    np.absolute(
+                        np.fft.rfft(
+                            audio_frames[chunk_indices, :] * window_function, axis=1
+                        )
+                    )
+                )
+                cqt_frames[chunk_indices, :] = np.sqrt(
+                    cqt_kernel * audio_spectrogram.T
+                ).T
+            else:
+                cqt_frames[chunk_indices, :] = np.absolute(
+                    cqt_kernel * np.fft.fft(audio_frames[chunk_indices, :], axis=1).T
+                ).T
+
+        _threadchunks(len(time_indices), workers, compute_chunk)
+        _stage("cqt")
+
+        # Gather the extra outputs: the silence mask (if gating), and the scale and offset of the CQT spectrogram
+        # converted to dB and quantized (if required)
+        output_info = {}
+        if silence_threshold is not None:
+            output_info["silence_mask"] = silence_mask
+        if quantization is not None:
+            (
+                cqt_spectrogram,
+                output_info["feature_scale"],
+                output_info["feature_offset"],
+            ) = _quantize(cqt_spectrogram, quantization, dynamic_range)
+            _stage("quantization")
 
-    # Initialize the CQT spectrogram
-    cqt_spectrogram = np.zeros((number_frequencies, number_times))
+        if output_info:
+            return cqt_spectrogram, output_info
+        return cqt_spectrogram
 
     # Loop over the time frames
     i = 0
     for j in range(number_times):
 
         # Compute the magnitude CQT using the kernel
-        cqt_spectrogram[:, j] = np.absolute(
+        cqt_frames[j, :] = np.absolute(
             cqt_kernel * np.fft.fft(audio_signal[i : i + fft_length])
         )
         i = i + step_length
+    _stage("cqt")
+
+    # Convert the CQT spectrogram to dB and quantize it, with its scale and offset as extra outputs (if required)
+    if quantization is not None:
+        cqt_spectrogram, feature_scale, feature_offset = _quantize(
+            cqt_spectrogram, quantization, dynamic_range
+        )
+        _stage("quantization")
+        return cqt_spectrogram, {
+            "feature_scale": feature_scale,
+            "feature_offset": feature_offset,
+        }
 
     return cqt_spectrogram
 
 
+@_profile
 def cqtchromagram(
-    audio_signal, sampling_frequency, time_resolution, octave_resolution, cqt_kernel
+    audio_signal,
+    sampling_frequency,
+    time_resolution,
+    octave_resolution,
+    cqt_kernel,
+    target_sampling_frequency=None,
 ):
     """
     Compute the constant-Q transform (CQT) chromagram using a CQT kernel.
@@ -648,7 +2005,10 @@ def cqtchromagram(
         sampling_frequency: sampling frequency in Hz
         time_resolution: number of time frames per second
         octave_resolution: number of frequency channels per octave
-        cqt_kernel: CQT kernel (number_frequencies, fft_length)
+        cqt_kernel: CQT kernel (number_frequencies, fft_length), or CQT filterbank (number_frequencies, window_length/2+1)
+            for an approximate CQT mapped from an STFT (faster, see zaf.cqtfilterbank)
+        target_sampling_frequency: sampling frequency in Hz to resample the signal to before the framing
+            (the CQT kernel is then for the target sampling frequency) (default: None, i.e., no resampling)
     Output:
         cqt_chromagram: CQT chromagram (octave_resolution, number_times)
 
@@ -682,8 +2042,13 @@ def cqtchromagram(
 
     # Compute the CQT spectrogram
     cqt_spectrogram = cqtspectrogram(
-        audio_signal, sampling_frequency, time_resolution, cqt_kernel
+        audio_signal,
+        sampling_frequency,
+        time_resolution,
+        cqt_kernel,
+        target_sampling_frequency,
     )
+    _stage("cqtspectrogram")
 
     # Get the number of frequency channels and time frames
     number_frequencies, number_times = np.shape(cqt_spectrogram)
@@ -698,11 +2063,918 @@ def cqtchromagram(
         cqt_chromagram[i, :] = np.sum(
             cqt_spectrogram[i:number_frequencies:octave_resolution, :], axis=0
         )
+    _stage("chroma")
 
     return cqt_chromagram
 
 
-def dct(audio_signal, dct_type):
+@_profile
+def chromaembedding(cqt_chromagram, patch_length=75):
+    """
+    Compute a fixed-size, transposition-invariant embedding of a chromagram (for cover and duplicate search).
+
+    Inputs:
+        cqt_chromagram: CQT chromagram (octave_resolution, number_times)
+        patch_length: number of time frames per patch (half-overlapping) (default: 75, i.e., 3 seconds at 25 frames per second)
+    Output:
+        chroma_embedding: median over the patches of the magnitude of their 2D Fourier transform (invariant to the
+            circular shifts of the chroma, i.e., to the transpositions), normalized to a unit norm
+            (octave_resolution*(floor(patch_length/2)+1),)
+
+    Example: Find the 5 tracks of a catalog which are the most similar to a query track.
+        # Import the needed modules
+        import numpy as np
+        import zaf
+
+        # Compute the CQT kernel once for all the tracks
+        sampling_frequency = 44100
+        octave_resolution = 12
+        cqt_kernel = zaf.cqtkernel(sampling_frequency, octave_resolution, 55, 3520)
+
+        # Compute the embedding of an audio file
+        def compute_embedding(audio_file):
+            audio_signal, sampling_frequency = zaf.wavread(audio_file)
+            audio_signal = np.mean(audio_signal, 1)
+            cqt_chromagram = zaf.cqtchromagram(audio_signal, sampling_frequency, 25, octave_resolution, cqt_kernel)
+            return zaf.chromaembedding(cqt_chromagram)
+
+        # Add the tracks of the catalog to the index (incrementally) and save it
+        chroma_index = zaf.ChromaIndex()
+        for audio_file in ["track1.wav", "track2.wav", "track3.wav"]:
+            chroma_index.add([audio_file], compute_embedding(audio_file)[np.newaxis, :])
+        chroma_index.save("chroma_index.npz")
+
+        # Search the index for the query
+        chroma_index = zaf.ChromaIndex.load("chroma_index.npz")
+        neighbor_keys, neighbor_similarities = chroma_index.search(compute_embedding("audio_file.wav"), 5)
+    """
+
+    # Normalize every time frame by its maximum (loudness invariance) and compress the dynamic range
+    cqt_chromagram = cqt_chromagram / (
+        np.max(cqt_chromagram, axis=0) + np.finfo(float).eps
+    )
+    cqt_chromagram = np.log(1 + 100 * cqt_chromagram)
+
+    # Zero-pad the chromagram to at least one patch
+    octave_resolution, number_times = np.shape(cqt_chromagram)
+    cqt_chromagram = np.pad(
+        cqt_chromagram, ((0, 0), (0, max(patch_length - number_times, 0)))
+    )
+
+    # Split the chromagram into half-overlapping patches (strided view)
+    chroma_patches = np.lib.stride_tricks.sliding_window_view(
+        cqt_chromagram, patch_length, axis=1
+    )[:, :: max(int(patch_length / 2), 1), :]
+    _stage("patches")
+
+    # Compute the magnitude of the 2D Fourier transform of all the patches at once (over the chroma and the time)
+    # and take the median over the patches
+    chroma_embedding = np.median(
+        np.absolute(np.fft.rfft2(chroma_patches, axes=(0, 2))), axis=1
+    ).ravel()
+    _stage("2d fft")
+
+    # Normalize the embedding to a unit norm (the dot product is then the cosine similarity)
+    chroma_embedding = chroma_embedding / (
+        np.linalg.norm(chroma_embedding) + np.finfo(float).eps
+    )
+
+    return chroma_embedding.astype(np.float32)
+
+
+class ChromaIndex:
+    """
+    Index of chroma embeddings (e.g., from zaf.chromaembedding) with incremental insertions and top-k search.
+
+    Inputs:
+        embedding_length: length of the embeddings (default: None, i.e., given by the first insertion)
+    Attributes:
+        keys: keys of the items (e.g., paths of the audio files) [key, ...]
+        embeddings: embeddings of the items (float32) (number_items, embedding_length)
+    Methods:
+        add(keys, embeddings): insert items (embeddings of shape (number_items, embedding_length))
+        search(query_embeddings, number_neighbors=10, block_length=1024): return the keys and the cosine
+            similarities of the most similar items for every query ([[key, ...], ...], (number_queries, number_neighbors))
+            (a single query (embedding_length,) returns a list of keys and an array (number_neighbors,))
+        save(index_file): save the index into a NumPy .npz file
+        load(index_file): load an index from a NumPy .npz file (class method)
+
+    The embeddings are stored in one array growing by doubling (amortized constant-time insertions), and the
+    queries are scored against all the items with matrix products, by blocks of queries.
+    """
+
+    def __init__(self, embedding_length=None):
+
+        # Initialize the keys and the (empty) embedding array
+        self.keys = []
+        self._embeddings = np.zeros((0, embedding_length or 0), dtype=np.float32)
+
+    @property
+    def embeddings(self):
+
+        return self._embeddings[0 : len(self.keys), :]
+
+    def add(self, keys, embeddings):
+
+        # Check the shape of the embeddings (the first insertion sets the embedding length of an empty index)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if np.ndim(embeddings) != 2 or len(embeddings) != len(keys):
+            raise ValueError(
+                "The embeddings must be of shape (number_items, embedding_length)."
+            )
+        if len(self.keys) == 0 and np.shape(self._embeddings)[1] == 0:
+            self._embeddings = np.zeros((0, np.shape(embeddings)[1]), dtype=np.float32)
+        if np.shape(embeddings)[1] != np.shape(self._embeddings)[1]:
+            raise ValueError(
+                f"The embeddings must be of length {np.shape(self._embeddings)[1]}."
+            )
+
+        # Grow the embedding array by doubling its capacity if needed, and copy the new embeddings
+        number_items = len(self.keys)
+        if number_items + len(keys) > len(self._embeddings):
+            embedding_array = np.zeros(
+                (
+                    max(2 * len(self._embeddings), number_items + len(keys)),
+                    np.shape(self._embeddings)[1],
+                ),
+                dtype=np.float32,
+            )
+            embedding_array[0:number_items, :] = self._embeddings[0:number_items, :]
+            self._embeddings = embedding_array
+        self._embeddings[number_items : number_items + len(keys), :] = embeddings
+        self.keys.extend(keys)
+
+    def search(self, query_embeddings, number_neighbors=10, block_length=1024):
+
+        # Score the queries against all the items (BLAS matrix product, by blocks of queries to bound the memory)
+        single_query = np.ndim(query_embeddings) == 1
+        query_embeddings = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        number_queries = len(query_embeddings)
+        number_neighbors = min(number_neighbors, len(self.keys))
+        neighbor_indices = np.zeros((number_queries, number_neighbors), dtype=int)
+        neighbor_similarities = np.zeros(
+            (number_queries, number_neighbors), dtype=np.float32
+        )
+        for start_index in range(0, number_queries, block_length):
+            end_index = min(start_index + block_length, number_queries)
+            query_similarities = np.matmul(
+                query_embeddings[start_index:end_index, :], self.embeddings.T
+            )
+
+            # Select the top-k items without sorting all of them, and sort them by decreasing similarity
+            if number_neighbors < len(self.keys):
+                top_indices = np.argpartition(
+                    -query_similarities, number_neighbors - 1, axis=1
+                )[:, 0:number_neighbors]
+            else:
+                top_indices = np.tile(
+                    np.arange(len(self.keys)), (end_index - start_index, 1)
+                )
+            top_similarities = np.take_along_axis(query_similarities, top_indices, 1)
+            sort_indices = np.argsort(-top_similarities, axis=1)
+            neighbor_indices[start_index:end_index, :] = np.take_along_axis(
+                top_indices, sort_indices, 1
+            )
+            neighbor_similarities[start_index:end_index, :] = np.take_along_axis(
+                top_similarities, sort_indices, 1
+            )
+
+        # Map the indices to the keys
+        neighbor_keys = [
+            [self.keys[neighbor_index] for neighbor_index in query_indices]
+            for query_indices in neighbor_indices
+        ]
+
+        if single_query:
+            return neighbor_keys[0], neighbor_similarities[0, :]
+        return neighbor_keys, neighbor_similarities
+
+    def save(self, index_file):
+
+        np.savez(
+            index_file, keys=np.array(self.keys, dtype=str), embeddings=self.embeddings
+        )
+
+    @classmethod
+    def load(cls, index_file):
+
+        with np.load(index_file) as index_data:
+            chroma_index = cls(np.shape(index_data["embeddings"])[1])
+            chroma_index.add(
+                [str(key) for key in index_data["keys"]], index_data["embeddings"]
+            )
+
+        return chroma_index
+
+
+@_profile
+def landmarks(
+    audio_signal,
+    window_function,
+    step_length,
+    neighborhood_size=(15, 15),
+    peak_threshold=10,
+    fan_out=5,
+    maximum_delta_time=63,
+    maximum_delta_frequency=127,
+):
+    """
+    Compute the landmarks of a signal (hashed pairs of spectral peaks) for audio fingerprinting.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        window_function: window function (window_length,)
+        step_length: step length in samples
+        neighborhood_size: size of the neighborhood in which a spectral peak is the maximum (frequencies, times)
+            (default: (15, 15))
+        peak_threshold: minimum level in dB of the spectral peaks above the median level of the spectrogram
+            (so that the peaks of the noise floor are not kept) (default: 10)
+        fan_out: maximum number of peaks paired with every (anchor) peak (default: 5)
+        maximum_delta_time: maximum time difference in time frames between two paired peaks (default: 63)
+        maximum_delta_frequency: maximum frequency difference in frequency channels between two paired peaks
+            (default: 127)
+    Outputs:
+        landmark_hashes: hashes of the peak pairs, from their frequencies and time difference (f1, f2, dt)
+            (number_landmarks,)
+        landmark_times: time frames of the anchor peaks (number_landmarks,)
+
+    Example: Identify the audio file from which a noisy 5-second excerpt comes from.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+
+        # Set the parameters of the STFT (about 46 ms windows at 22050 Hz)
+        window_function = scipy.signal.hamming(1024, sym=False)
+        step_length = 512
+
+        # Compute the landmarks of an audio file (averaged over its channels and resampled to 22050 Hz)
+        def compute_landmarks(audio_signal, sampling_frequency):
+            audio_signal = zaf.resample(np.mean(audio_signal, 1), sampling_frequency, 22050)
+            return zaf.landmarks(audio_signal, window_function, step_length)
+
+        # Add the audio files to the index
+        fingerprint_index = zaf.FingerprintIndex()
+        for audio_file in ["audio_file.wav", "other_file.wav"]:
+            landmark_hashes, landmark_times = compute_landmarks(*zaf.wavread(audio_file))
+            fingerprint_index.add(audio_file, landmark_hashes, landmark_times)
+
+        # Take a noisy 5-second excerpt of the audio file, and identify it (with its start time in seconds)
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_excerpt = audio_signal[10*sampling_frequency:15*sampling_frequency, :]
+        audio_excerpt = audio_excerpt + 0.1*np.random.randn(*np.shape(audio_excerpt))
+        landmark_hashes, landmark_times = compute_landmarks(audio_excerpt, sampling_frequency)
+        match_keys, match_scores, match_offsets = fingerprint_index.search(landmark_hashes, landmark_times)
+        print(match_keys[0], match_scores[0], match_offsets[0]*step_length/22050)
+    """
+
+    # Compute the log-magnitude spectrogram (without the DC component and the mirrored frequencies)
+    number_frequencies = int(len(window_function) / 2)
+    audio_spectrogram = np.log(
+        np.absolute(
+            stft(audio_signal, window_function, step_length)[
+                1 : number_frequencies + 1, :
+            ]
+        )
+        + np.finfo(float).eps
+    )
+    _stage("stft")
+
+    # Pick the spectral peaks: the local maxima over their neighborhood (2D maximum filter) above the threshold
+    peak_mask = (
+        scipy.ndimage.maximum_filter(
+            audio_spectrogram, size=neighborhood_size, mode="constant", cval=-np.inf
+        )
+        == audio_spectrogram
+    ) & (
+        audio_spectrogram
+        > np.median(audio_spectrogram) + peak_threshold * np.log(10) / 20
+    )
+    peak_times, peak_frequencies = np.nonzero(peak_mask.T)
+    _stage("peaks")
+
+    # Pair every (anchor) peak with the next peaks in time (sorted by time then frequency), one offset at a time,
+    # and keep the pairs in the target zone of the anchor (at most fan_out of them)
+    anchor_indices = []
+    target_indices = []
+    number_targets = np.zeros(len(peak_times), dtype=int)
+    i = 1
+    while i < len(peak_times) and np.any(number_targets < fan_out):
+        delta_times = peak_times[i:] - peak_times[:-i]
+        if np.all(delta_times > maximum_delta_time):
+            break
+        pair_indices = np.flatnonzero(
+            (delta_times > 0)
+            & (delta_times <= maximum_delta_time)
+            & (
+                np.absolute(peak_frequencies[i:] - peak_frequencies[:-i])
+                <= maximum_delta_frequency
+            )
+            & (number_targets[:-i] < fan_out)
+        )
+        anchor_indices.append(pair_indices)
+        target_indices.append(pair_indices + i)
+        number_targets[pair_indices] += 1
+        i = i + 1
+    anchor_indices = np.concatenate(anchor_indices or [np.zeros(0, dtype=int)])
+    target_indices = np.concatenate(target_indices or [np.zeros(0, dtype=int)])
+
+    # Hash the pairs as (f1, f2, dt), and sort the landmarks by time
+    landmark_hashes = (
+        peak_frequencies[anchor_indices].astype(np.int64) * number_frequencies
+        + peak_frequencies[target_indices]
+    ) * (maximum_delta_time + 1) + (
+        peak_times[target_indices] - peak_times[anchor_indices]
+    )
+    landmark_times = peak_times[anchor_indices]
+    sort_indices = np.argsort(landmark_times, kind="stable")
+    landmark_hashes = landmark_hashes[sort_indices]
+    landmark_times = landmark_times[sort_indices]
+    _stage("pairs")
+
+    return landmark_hashes, landmark_times
+
+
+class FingerprintIndex:
+    """
+    Index of landmarks (e.g., from zaf.landmarks) with incremental insertions and offset-histogram search.
+
+    Methods:
+        add(key, landmark_hashes, landmark_times): insert the landmarks of an item (e.g., the path of an audio file)
+        search(landmark_hashes, landmark_times, number_matches=5): return the keys of the best matching items,
+            their scores (number of landmarks matching at the best time offset), and their time offsets in time
+            frames (start of the query in the item) ([key, ...], (number_matches,), (number_matches,))
+        save(index_file): save the index into a NumPy .npz file
+        load(index_file): load an index from a NumPy .npz file (class method)
+
+    The landmarks are stored in arrays sorted by hash (the insertions since the last search are merged at the next
+    one), so that a query is matched with binary searches and the offsets are histogrammed without a Python loop.
+    """
+
+    def __init__(self):
+
+        # Initialize the keys, the sorted landmark arrays, and the landmarks inserted since the last sorting
+        self.keys = []
+        self._hashes = np.zeros(0, dtype=np.int64)
+        self._items = np.zeros(0, dtype=np.int32)
+        self._times = np.zeros(0, dtype=np.int32)
+        self._pending = []
+
+    def add(self, key, landmark_hashes, landmark_times):
+
+        self._pending.append(
+            (
+                np.asarray(landmark_hashes, dtype=np.int64),
+                np.full(len(landmark_hashes), len(self.keys), dtype=np.int32),
+                np.asarray(landmark_times, dtype=np.int32),
+            )
+        )
+        self.keys.append(key)
+
+    def search(self, landmark_hashes, landmark_times, number_matches=5):
+
+        # Merge the pending landmarks into the sorted arrays
+        self._merge()
+
+        # Find the range of the landmarks of every query hash with binary searches, and gather all the matches
+        landmark_hashes = np.asarray(landmark_hashes, dtype=np.int64)
+        start_indices = np.searchsorted(self._hashes, landmark_hashes, "left")
+        end_indices = np.searchsorted(self._hashes, landmark_hashes, "right")
+        match_counts = end_indices - start_indices
+        total_matches = np.sum(match_counts)
+        match_indices = np.repeat(
+            start_indices - (np.cumsum(match_counts) - match_counts), match_counts
+        ) + np.arange(total_matches)
+        match_items = self._items[match_indices].astype(np.int64)
+        match_offsets = self._times[match_indices] - np.repeat(
+            np.asarray(landmark_times, dtype=np.int64), match_counts
+        )
+        _stage("matches")
+
+        # Histogram the matches by item and time offset (the true item has many matches at the same offset)
+        if total_matches > 0:
+            minimum_offset = np.min(match_offsets)
+            offset_span = np.max(match_offsets) - minimum_offset + 1
+        else:
+            minimum_offset, offset_span = 0, 1
+        histogram_bins, histogram_counts = np.unique(
+            match_items * offset_span + (match_offsets - minimum_offset),
+            return_counts=True,
+        )
+
+        # Keep the best offset of every item, and the items with the highest counts
+        sort_indices = np.argsort(-histogram_counts, kind="stable")
+        histogram_bins = histogram_bins[sort_indices]
+        histogram_counts = histogram_counts[sort_indices]
+        _, best_indices = np.unique(histogram_bins // offset_span, return_index=True)
+        best_indices = np.sort(best_indices)[0:number_matches]
+        match_keys = [
+            self.keys[item_index]
+            for item_index in histogram_bins[best_indices] // offset_span
+        ]
+        match_scores = histogram_counts[best_indices]
+        match_offsets = histogram_bins[best_indices] % offset_span + minimum_offset
+        _stage("histogram")
+
+        return match_keys, match_scores, match_offsets
+
+    def save(self, index_file):
+
+        self._merge()
+        np.savez(
+            index_file,
+            keys=np.array(self.keys, dtype=str),
+            hashes=self._hashes,
+            items=self._items,
+            times=self._times,
+        )
+
+    @classmethod
+    def load(cls, index_file):
+
+        fingerprint_index = cls()
+        with np.load(index_file) as index_data:
+            fingerprint_index.keys = [str(key) for key in index_data["keys"]]
+            fingerprint_index._hashes = index_data["hashes"]
+            fingerprint_index._items = index_data["items"]
+            fingerprint_index._times = index_data["times"]
+
+        return fingerprint_index
+
+    def _merge(self):
+
+        # Concatenate the pending landmarks to the sorted ones and sort them by hash (stable, so the merge is cheap)
+        if not self._pending:
+            return
+        landmark_arrays = [(self._hashes, self._items, self._times)] + self._pending
+        self._hashes, self._items, self._times = [
+            np.concatenate(landmark_array) for landmark_array in zip(*landmark_arrays)
+        ]
+        sort_indices = np.argsort(self._hashes, kind="stable")
+        self._hashes = self._hashes[sort_indices]
+        self._items = self._items[sort_indices]
+        self._times = self._times[sort_indices]
+        self._pending = []
+
+
+@_profile
+def selfsimilarity(
+    audio_features,
+    metric="cosine",
+    maximum_lag=None,
+    similarity_file=None,
+    dtype=np.float32,
+    tile_length=1024,
+):
+    """
+    Compute the self-similarity matrix of features by tiles (with a bounded memory).
+
+    Inputs:
+        audio_features: audio features (number_features, number_times)
+        metric: "cosine" (cosine similarity) or "euclidean" (Euclidean distance) (default: "cosine")
+        maximum_lag: maximum time lag in time frames computed around the diagonal, only the band of the matrix
+            being stored then (default: None, i.e., all of them, for the full matrix)
+        similarity_file: path to a file to write the matrix into as a memory-map (NumPy .npy format)
+            (default: None, i.e., in memory)
+        dtype: data type of the matrix (default: np.float32)
+        tile_length: number of time frames per tile (default: 1024)
+    Output:
+        similarity_matrix: self-similarity matrix (memory-mapped if a file is given) (number_times, number_times),
+            or its band if maximum_lag is given (number_times, 2*maximum_lag+1), where the column maximum_lag+lag
+            holds the similarity of the time frames with the ones lag time frames after them (0 outside the matrix)
+
+    Example: Compute and display the self-similarity matrix of the MFCCs of an audio file.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the MFCCs
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 40)
+        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, 20)
+
+        # Compute the self-similarity matrix into a memory-mapped file (in float32 by tiles)
+        similarity_matrix = zaf.selfsimilarity(audio_mfcc, "cosine", similarity_file="similarity_file.npy")
+
+        # Display the self-similarity matrix in seconds
+        number_times = np.shape(similarity_matrix)[0]
+        time_extent = number_times*step_length/sampling_frequency
+        plt.figure(figsize=(7, 7))
+        plt.imshow(similarity_matrix, cmap="jet", origin="lower", extent=(0, time_extent, 0, time_extent))
+        plt.title("Self-similarity matrix")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Time (s)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Prepare the (time-major) features for the tiles
+    audio_features, feature_norms = _similarityfeatures(audio_features, metric, dtype)
+    number_times = len(audio_features)
+
+    # Derive the shape of the matrix (the full matrix, or its band with a column per time lag)
+    if maximum_lag is None:
+        matrix_shape = (number_times, number_times)
+    else:
+        matrix_shape = (number_times, 2 * maximum_lag + 1)
+
+    # Initialize the self-similarity matrix (in memory or memory-mapped to the file)
+    if similarity_file is None:
+        similarity_matrix = np.zeros(matrix_shape, dtype=dtype)
+    else:
+        similarity_matrix = np.lib.format.open_memmap(
+            similarity_file, mode="w+", dtype=dtype, shape=matrix_shape
+        )
+
+    # Loop over the tiles of rows, and compute all the columns or the time lags within the band only
+    for start_time in range(0, number_times, tile_length):
+        end_time = min(start_time + tile_length, number_times)
+        if maximum_lag is None:
+            similarity_matrix[start_time:end_time, :] = _similaritytile(
+                audio_features,
+                feature_norms,
+                metric,
+                start_time,
+                end_time,
+                0,
+                number_times,
+            )
+        else:
+            similarity_matrix[start_time:end_time, :] = _similaritylags(
+                audio_features,
+                feature_norms,
+                metric,
+                start_time,
+                end_time,
+                -maximum_lag,
+                maximum_lag + 1,
+            )
+    _stage("tiles")
+
+    if similarity_file is not None:
+        similarity_matrix.flush()
+
+    return similarity_matrix
+
+
+@_profile
+def selfsimilaritycurves(
+    audio_features,
+    metric="cosine",
+    kernel_size=64,
+    maximum_lag=None,
+    tile_length=1024,
+):
+    """
+    Compute the novelty curve and the lag curve of the self-similarity of features, by tiles and without the full matrix.
+
+    Inputs:
+        audio_features: audio features (number_features, number_times)
+        metric: "cosine" (cosine similarity) or "euclidean" (Euclidean distance) (default: "cosine")
+        kernel_size: size of the Gaussian-tapered checkerboard kernel for the novelty curve (even) (default: 64)
+        maximum_lag: maximum time lag in time frames for the lag curve (default: None, i.e., all of them)
+        tile_length: number of time frames per tile (default: 1024)
+    Outputs:
+        novelty_curve: novelty of the time frames, i.e., correlation of the checkerboard kernel along the diagonal
+            (computed on the negative distance for "euclidean") (number_times,)
+        lag_curve: mean similarity (or distance) between the time frames and the ones after them, for every time lag
+            (maximum_lag+1,)
+
+    Example: Compute the novelty curve of the MFCCs of an audio file and find its segment boundaries.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the MFCCs
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 40)
+        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, 20)
+
+        # Compute the novelty curve (and the lag curve up to 10 seconds)
+        time_resolution = sampling_frequency/step_length
+        novelty_curve, lag_curve = zaf.selfsimilaritycurves(audio_mfcc, "cosine", 64, int(10*time_resolution))
+
+        # Find the segment boundaries as the peaks of the novelty curve (at least 2 seconds apart)
+        boundary_times = scipy.signal.find_peaks(novelty_curve, distance=2*time_resolution)[0]/time_resolution
+
+        # Display the novelty curve and the boundaries in seconds
+        plt.figure(figsize=(14, 3))
+        plt.plot(np.arange(len(novelty_curve))/time_resolution, novelty_curve)
+        plt.vlines(boundary_times, np.min(novelty_curve), np.max(novelty_curve), colors="r")
+        plt.title("Novelty curve")
+        plt.xlabel("Time (s)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Prepare the (time-major) features for the tiles
+    audio_features, feature_norms = _similarityfeatures(
+        audio_features, metric, np.float32
+    )
+    number_times = len(audio_features)
+    if maximum_lag is None:
+        maximum_lag = max(number_times - 1, 0)
+
+    # Compute the checkerboard kernel tapered by a Gaussian (positive within the segments, negative across them)
+    # (negated for the Euclidean distance, so that the novelty is high at the boundaries in both cases)
+    half_size = int(kernel_size / 2)
+    kernel_signs = np.concatenate((-np.ones(half_size), np.ones(half_size)))
+    kernel_taper = scipy.signal.windows.gaussian(2 * half_size, half_size / 2)
+    checkerboard_kernel = np.outer(
+        kernel_signs * kernel_taper, kernel_signs * kernel_taper
+    ).astype(np.float32)
+    if metric == "euclidean":
+        checkerboard_kernel = -checkerboard_kernel
+
+    # Initialize the novelty curve and the sums and counts of the lag curve
+    novelty_curve = np.zeros(number_times)
+    lag_sums = np.zeros(maximum_lag + 1)
+    lag_counts = np.zeros(maximum_lag + 1)
+
+    # Loop over the tiles of time frames
+    for start_time in range(0, number_times, tile_length):
+        end_time = min(start_time + tile_length, number_times)
+
+        # Compute the square tile around the diagonal spanned by the kernel, zero-padded outside of the matrix,
+        # and correlate the kernel with its patches centered on the diagonal
+        start_column = max(start_time - half_size, 0)
+        end_column = min(end_time + half_size, number_times)
+        padded_length = end_time - start_time + 2 * half_size
+        similarity_tile = np.zeros((padded_length, padded_length), dtype=np.float32)
+        padding_start = start_column - (start_time - half_size)
+        similarity_tile[
+            padding_start : padding_start + end_column - start_column,
+            padding_start : padding_start + end_column - start_column,
+        ] = _similaritytile(
+            audio_features,
+            feature_norms,
+            metric,
+            start_column,
+            end_column,
+            start_column,
+            end_column,
+        )
+        diagonal_patches = np.lib.stride_tricks.sliding_window_view(
+            similarity_tile, (2 * half_size, 2 * half_size)
+        )
+        diagonal_patches = diagonal_patches[
+            np.arange(end_time - start_time), np.arange(end_time - start_time)
+        ]
+        novelty_curve[start_time:end_time] = np.einsum(
+            "tij,ij->t", diagonal_patches, checkerboard_kernel
+        )
+
+        # Loop over the chunks of time lags, and accumulate the similarities of the rows with the time frames
+        # these lags after them (0 past the end of the matrix, and not counted)
+        for start_lag in range(0, maximum_lag + 1, tile_length):
+            end_lag = min(start_lag + tile_length, maximum_lag + 1)
+            lag_sums[start_lag:end_lag] += np.sum(
+                _similaritylags(
+                    audio_features,
+                    feature_norms,
+                    metric,
+                    start_time,
+                    end_time,
+                    start_lag,
+                    end_lag,
+                ),
+                axis=0,
+            )
+            lag_counts[start_lag:end_lag] += np.clip(
+                number_times - start_time - np.arange(start_lag, end_lag),
+                0,
+                end_time - start_time,
+            )
+    _stage("tiles")
+
+    # Derive the mean similarity for every lag
+    lag_curve = lag_sums / np.maximum(lag_counts, 1)
+
+    return novelty_curve, lag_curve
+
+
+@_profile
+def dtw(
+    reference_features,
+    query_features,
+    metric="euclidean",
+    band_width=None,
+    multiscale_radius=None,
+    minimum_length=256,
+):
+    """
+    Align two feature sequences using dynamic time warping (DTW), within a band or coarse to fine.
+
+    Inputs:
+        reference_features: reference audio features (number_features, number_references)
+        query_features: query audio features (number_features, number_queries)
+        metric: "euclidean" (Euclidean distance) or "cosine" (1 - cosine similarity) (default: "euclidean")
+        band_width: half-width in time frames of the Sakoe-Chiba band around the (scaled) diagonal
+            (default: None, i.e., no band)
+        multiscale_radius: radius in time frames of the corridor around the path projected from the coarser scale,
+            for a multiscale DTW (the sequences are halved until they are shorter than minimum_length)
+            (default: None, i.e., a single scale)
+        minimum_length: maximum length of the sequences at the coarsest scale (for a multiscale DTW) (default: 256)
+    Outputs:
+        alignment_path: time frames of the reference and of the query aligned by the warping path (path_length, 2)
+        alignment_cost: total cost of the warping path
+
+    Example: Align the MFCCs of an audio file with the ones of a time-stretched version of it.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Slow the signal down by 20% (resampling it and keeping the same sampling frequency)
+        audio_signal2 = zaf.resample(audio_signal, 5*sampling_frequency, 6*sampling_frequency)
+
+        # Compute the MFCCs of both signals
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 40)
+        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, 20)
+        audio_mfcc2 = zaf.mfcc(audio_signal2, window_function, step_length, mel_filterbank, 20)
+
+        # Align the MFCCs with a multiscale DTW (corridor of 8 time frames)
+        alignment_path, alignment_cost = zaf.dtw(audio_mfcc, audio_mfcc2, "euclidean", multiscale_radius=8)
+
+        # Display the warping path in seconds
+        time_resolution = sampling_frequency/step_length
+        plt.figure(figsize=(7, 7))
+        plt.plot(alignment_path[:, 0]/time_resolution, alignment_path[:, 1]/time_resolution)
+        plt.title("Warping path")
+        plt.xlabel("Reference time (s)")
+        plt.ylabel("Query time (s)")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Prepare the (time-major) features
+    reference_features, reference_norms = _similarityfeatures(
+        reference_features, metric, float
+    )
+    query_features, query_norms = _similarityfeatures(query_features, metric, float)
+    number_references = len(reference_features)
+    number_queries = len(query_features)
+
+    # Compute the DTW at the coarser scales first if multiscale (averaging pairs of time frames), and derive the
+    # corridor from the path projected to this scale
+    if multiscale_radius is not None and (
+        max(number_references, number_queries) > minimum_length
+    ):
+        coarse_path, _ = dtw(
+            _halvefeatures(reference_features).T,
+            _halvefeatures(query_features).T,
+            metric,
+            None,
+            multiscale_radius,
+            minimum_length,
+        )
+        _stage("coarse scale")
+
+        # Every coarse cell covers 2x2 fine cells (clipped at the ends of the sequences)
+        start_columns = np.full(number_references, number_queries)
+        end_columns = np.zeros(number_references, dtype=int)
+        for row_offset in (0, 1):
+            fine_rows = np.minimum(
+                2 * coarse_path[:, 0] + row_offset, number_references - 1
+            )
+            np.minimum.at(start_columns, fine_rows, 2 * coarse_path[:, 1])
+            np.maximum.at(
+                end_columns,
+                fine_rows,
+                np.minimum(2 * coarse_path[:, 1] + 2, number_queries),
+            )
+
+        # Widen the corridor by the radius, in time frames of the reference and of the query
+        start_columns = (
+            scipy.ndimage.minimum_filter1d(start_columns, 2 * multiscale_radius + 1)
+            - multiscale_radius
+        )
+        end_columns = (
+            scipy.ndimage.maximum_filter1d(end_columns, 2 * multiscale_radius + 1)
+            + multiscale_radius
+        )
+
+    # Otherwise, derive the Sakoe-Chiba band around the diagonal (scaled to the lengths), if any
+    elif band_width is not None:
+        diagonal_columns = (
+            np.arange(number_references)
+            * (number_queries - 1)
+            / max(number_references - 1, 1)
+        )
+        start_columns = np.ceil(diagonal_columns).astype(int) - band_width
+        end_columns = np.floor(diagonal_columns).astype(int) + band_width + 1
+
+    # Otherwise, use the full matrix
+    else:
+        start_columns = np.zeros(number_references, dtype=int)
+        end_columns = np.full(number_references, number_queries)
+
+    # Clip the corridor, start and end it at the corners, and connect the consecutive rows (so a path exists)
+    start_columns = np.clip(start_columns, 0, number_queries - 1)
+    end_columns = np.clip(end_columns, 1, number_queries)
+    start_columns[0] = 0
+    end_columns[-1] = number_queries
+    start_columns = np.minimum.accumulate(start_columns[::-1])[::-1]
+    end_columns = np.maximum.accumulate(end_columns)
+    start_columns[1:] = np.minimum(start_columns[1:], end_columns[:-1])
+    _stage("corridor")
+
+    # Initialize the accumulated costs of the corridor, stored row after row (memory linear in its size)
+    row_offsets = np.concatenate(([0], np.cumsum(end_columns - start_columns)))
+    accumulated_costs = np.zeros(row_offsets[-1])
+
+    # Loop over the rows (the time frames of the reference)
+    previous_costs = np.zeros(1)
+    previous_start = -1
+    for i in range(number_references):
+        start_column = start_columns[i]
+        end_column = end_columns[i]
+
+        # Compute the local costs of the row between the time frame of the reference and the ones of the query
+        local_costs = np.matmul(
+            query_features[start_column:end_column, :], reference_features[i, :]
+        )
+        if metric == "cosine":
+            local_costs = 1 - local_costs
+        else:
+            local_costs = np.sqrt(
+                np.maximum(
+                    query_norms[start_column:end_column]
+                    + reference_norms[i]
+                    - 2 * local_costs,
+                    0,
+                )
+            )
+
+        # Get the best accumulated cost from the previous row (vertical or diagonal step) for every column,
+        # infinite outside of its range (for the first row, only the corner is reachable, with a cost of 0)
+        extended_costs = np.full(end_column - start_column + 1, np.inf)
+        overlap_columns = np.arange(
+            max(start_column - 1, previous_start),
+            min(end_column, previous_start + len(previous_costs)),
+        )
+        extended_costs[overlap_columns - start_column + 1] = previous_costs[
+            overlap_columns - previous_start
+        ]
+        vertical_costs = np.minimum(extended_costs[1:], extended_costs[:-1])
+
+        # Add the horizontal steps with a prefix minimum (instead of a loop over the columns):
+        # D[j] = min_k<=j (V[k] + C[k] + ... + C[j]) = P[j] + min_k<=j (V[k] - P[k-1]), with P the cumulative costs
+        cumulative_costs = np.cumsum(local_costs)
+        row_costs = cumulative_costs + np.minimum.accumulate(
+            vertical_costs - (cumulative_costs - local_costs)
+        )
+        accumulated_costs[row_offsets[i] : row_offsets[i + 1]] = row_costs
+        previous_costs = row_costs
+        previous_start = start_column
+    _stage("accumulation")
+
+    # Backtrack the warping path from the end, taking the predecessor with the smallest accumulated cost
+    def accumulated_cost(i, j):
+        if i < 0 or j < start_columns[i] or j >= end_columns[i]:
+            return np.inf
+        return accumulated_costs[row_offsets[i] + j - start_columns[i]]
+
+    alignment_path = [(number_references - 1, number_queries - 1)]
+    i, j = alignment_path[0]
+    while i > 0 or j > 0:
+        i, j = min(
+            ((i - 1, j - 1), (i - 1, j), (i, j - 1)),
+            key=lambda cell: accumulated_cost(*cell),
+        )
+        alignment_path.append((i, j))
+    alignment_path = np.array(alignment_path[::-1])
+    _stage("backtracking")
+
+    return alignment_path, accumulated_costs[-1]
+
+
+@_profile
+def dct(audio_signal, dct_type):
     """
     Compute the discrete cosine transform (DCT) using the fast Fourier transform (FFT).
 
@@ -841,6 +3113,7 @@ def dct(audio_signal, dct_type):
         return audio_dct
 
 
+@_profile
 def dst(audio_signal, dst_type):
     """
     Compute the discrete sine transform (DST) using the fast Fourier transform (FFT).
@@ -983,15 +3256,19 @@ def dst(audio_signal, dst_type):
         return audio_dst
 
 
-def mdct(audio_signal, window_function):
+@_profile
+def mdct(audio_signal, window_function, workers=1, layout="frequency_major"):
     """
     Compute the modified discrete cosine transform (MDCT) using the fast Fourier transform (FFT).
 
     Inputs:
         audio_signal: audio signal (number_samples,)
         window_function: window function (window_length,)
+        workers: number of threads computing contiguous chunks of time frames in parallel (default: 1)
+        layout: "frequency_major" or "time_major" (the time frames are then computed and stored contiguously,
+            row by row) (default: "frequency_major")
     Output:
-        audio_mdct: audio MDCT (number_frequencies, number_times)
+        audio_mdct: audio MDCT (number_frequencies, number_times) (or (number_times, number_frequencies) if time-major)
 
     Example: Compute and display the MDCT as used in the AC-3 audio coding format.
         # Import the needed modules
@@ -1023,6 +3300,9 @@ def mdct(audio_signal, window_function):
         plt.show()
     """
 
+    # Check the layout of the output
+    _checklayout(layout)
+
     # Get the number of samples and the window length in samples
     number_samples = len(audio_signal)
     window_length = len(window_function)
@@ -1041,9 +3321,15 @@ def mdct(audio_signal, window_function):
         "constant",
         constant_values=0,
     )
+    _stage("padding")
 
-    # Initialize the MDCT
-    audio_mdct = np.zeros((number_frequencies, number_times))
+    # Initialize the MDCT, and get its time frames as rows (contiguous if time-major)
+    if layout == "time_major":
+        audio_mdct = np.zeros((number_times, number_frequencies))
+        mdct_frames = audio_mdct
+    else:
+        audio_mdct = np.zeros((number_frequencies, number_times))
+        mdct_frames = audio_mdct.T
 
     # Prepare the pre-processing and post-processing arrays
     preprocessing_array = np.exp(
@@ -1057,6 +3343,22 @@ def mdct(audio_signal, window_function):
         * np.arange(0.5, window_length / 2 + 0.5)
     )
 
+    # Compute the MDCT by contiguous chunks of time frames in parallel threads if more than one worker
+    if workers > 1:
+        audio_frames = np.lib.stride_tricks.sliding_window_view(
+            audio_signal, window_length
+        )[::step_length, :]
+
+        def compute_chunk(start_index, end_index):
+            mdct_frames[start_index:end_index, :] = _mdctframes(
+                audio_frames[start_index:end_index, :], window_function
+            )
+
+        _threadchunks(number_times, workers, compute_chunk)
+        _stage("transform")
+
+        return audio_mdct
+
     # Loop over the time frames
     # (Do the pre and post-processing, and take the FFT in the loop to avoid storing twice longer frames)
     i = 0
@@ -1070,24 +3372,38 @@ def mdct(audio_signal, window_function):
         audio_segment = np.fft.fft(audio_segment * preprocessing_array)
 
         # Truncate to the first half before post-processing (and take the real to ensure real values)
-        audio_mdct[:, j] = np.real(
+        mdct_frames[j, :] = np.real(
             audio_segment[0:number_frequencies] * postprocessing_array
         )
+    _stage("transform")
 
     return audio_mdct
 
 
-def imdct(audio_mdct, window_function):
+@_profile
+def mdctupdate(
+    audio_mdct,
+    audio_signal,
+    window_function,
+    start_index,
+    end_index,
+    layout="frequency_major",
+):
     """
-    Compute the inverse modified discrete cosine transform (MDCT) using the fast Fourier transform (FFT).
+    Update the modified discrete cosine transform (MDCT) after an edit of the signal (in place).
 
     Inputs:
-        audio_mdct: audio MDCT (number_frequencies, number_times)
+        audio_mdct: audio MDCT of the signal before the edit (number_frequencies, number_times)
+        audio_signal: audio signal after the edit (same number of samples) (number_samples,)
         window_function: window function (window_length,)
+        start_index: index of the first edited sample
+        end_index: index of the last edited sample (excluded)
+        layout: layout of the MDCT, "frequency_major" or "time_major" (as given to zaf.mdct) (default: "frequency_major")
     Output:
-        audio_signal: audio signal (number_samples,)
+        audio_mdct: audio MDCT of the signal after the edit (the same array) (number_frequencies, number_times)
+            (or (number_times, number_frequencies) if time-major)
 
-    Example: Verify that the MDCT is perfectly invertible.
+    Example: Mute two seconds of an audio file and update its MDCT.
         # Import the needed modules
         import numpy as np
         import zaf
@@ -1102,33 +3418,107 @@ def imdct(audio_mdct, window_function):
         window_function = np.sin(np.pi/2*pow(np.sin(np.pi/window_length*np.arange(0.5, window_length+0.5)), 2))
         audio_mdct = zaf.mdct(audio_signal, window_function)
 
-        # Compute the inverse MDCT
-        audio_signal2 = zaf.imdct(audio_mdct, window_function)
-        audio_signal2 = audio_signal2[0:len(audio_signal)]
+        # Mute the signal between 2 and 4 seconds
+        start_index = 2*sampling_frequency
+        end_index = 4*sampling_frequency
+        audio_signal[start_index:end_index] = 0
 
-        # Compute the differences between the original signal and the resynthesized one
-        audio_differences = audio_signal-audio_signal2
-        y_max = np.max(np.absolute(audio_differences))
+        # Update the MDCT (only the time frames overlapping the edit are recomputed)
+        audio_mdct = zaf.mdctupdate(audio_mdct, audio_signal, window_function, start_index, end_index)
 
-        # Display the original and resynthesized signals, and their differences in seconds
-        xtick_step = 1
+        # Display the updated MDCT in dB, seconds, and Hz
         plt.figure(figsize=(14, 7))
-        plt.subplot(3, 1, 1), zaf.sigplot(audio_signal, sampling_frequency, xtick_step)
-        plt.ylim(-1, 1), plt.title("Original signal")
-        plt.subplot(3, 1, 2), zaf.sigplot(audio_signal2, sampling_frequency, xtick_step)
-        plt.ylim(-1, 1), plt.title("Resyntesized signal")
-        plt.subplot(3, 1, 3), zaf.sigplot(audio_differences, sampling_frequency, xtick_step)
-        plt.ylim(-y_max, y_max), plt.title("Original - resyntesized signal")
+        zaf.specshow(np.absolute(audio_mdct), len(audio_signal), sampling_frequency, xtick_step=1, ytick_step=1000)
+        plt.title("MDCT after the edit (dB)")
         plt.tight_layout()
         plt.show()
     """
 
-    # Get the number of frequency channels and time frames
-    number_frequencies, number_times = np.shape(audio_mdct)
-
-    # Derive the window length and the step length in samples (for clarity)
-    window_length = 2 * number_frequencies
-    step_length = number_frequencies
+    # Check the layout of the MDCT
+    _checklayout(layout)
+
+    # Get the window length and derive the step length in samples (also the zero-padding length at the start)
+    window_length = len(window_function)
+    step_length = int(window_length / 2)
+
+    # Derive the time frames whose windows overlap the edit
+    start_time, end_time = _editframes(
+        np.shape(audio_mdct)[0 if layout == "time_major" else 1],
+        window_length,
+        step_length,
+        step_length,
+        start_index,
+        end_index,
+    )
+
+    # Recompute the MDCT of these time frames only
+    audio_frames = _segmentframes(
+        audio_signal, window_length, step_length, step_length, start_time, end_time
+    )
+    if layout == "time_major":
+        audio_mdct[start_time:end_time, :] = _mdctframes(audio_frames, window_function)
+    else:
+        audio_mdct[:, start_time:end_time] = _mdctframes(
+            audio_frames, window_function
+        ).T
+    _stage("transform")
+
+    return audio_mdct
+
+
+@_profile
+def imdct(audio_mdct, window_function):
+    """
+    Compute the inverse modified discrete cosine transform (MDCT) using the fast Fourier transform (FFT).
+
+    Inputs:
+        audio_mdct: audio MDCT (number_frequencies, number_times)
+        window_function: window function (window_length,)
+    Output:
+        audio_signal: audio signal (number_samples,)
+
+    Example: Verify that the MDCT is perfectly invertible.
+        # Import the needed modules
+        import numpy as np
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the MDCT with a slope function as used in the Vorbis audio coding format
+        window_length = 2048
+        window_function = np.sin(np.pi/2*pow(np.sin(np.pi/window_length*np.arange(0.5, window_length+0.5)), 2))
+        audio_mdct = zaf.mdct(audio_signal, window_function)
+
+        # Compute the inverse MDCT
+        audio_signal2 = zaf.imdct(audio_mdct, window_function)
+        audio_signal2 = audio_signal2[0:len(audio_signal)]
+
+        # Compute the differences between the original signal and the resynthesized one
+        audio_differences = audio_signal-audio_signal2
+        y_max = np.max(np.absolute(audio_differences))
+
+        # Display the original and resynthesized signals, and their differences in seconds
+        xtick_step = 1
+        plt.figure(figsize=(14, 7))
+        plt.subplot(3, 1, 1), zaf.sigplot(audio_signal, sampling_frequency, xtick_step)
+        plt.ylim(-1, 1), plt.title("Original signal")
+        plt.subplot(3, 1, 2), zaf.sigplot(audio_signal2, sampling_frequency, xtick_step)
+        plt.ylim(-1, 1), plt.title("Resyntesized signal")
+        plt.subplot(3, 1, 3), zaf.sigplot(audio_differences, sampling_frequency, xtick_step)
+        plt.ylim(-y_max, y_max), plt.title("Original - resyntesized signal")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Get the number of frequency channels and time frames
+    number_frequencies, number_times = np.shape(audio_mdct)
+
+    # Derive the window length and the step length in samples (for clarity)
+    window_length = 2 * number_frequencies
+    step_length = number_frequencies
 
     # Derive the number of samples for the signal
     number_samples = step_length * (number_times + 1)
@@ -1169,6 +3559,7 @@ def imdct(audio_mdct, window_function):
         np.real(audio_mdct * postprocessing_array[:, np.newaxis])
         * window_function[:, np.newaxis]
     )
+    _stage("transform")
 
     # Loop over the time frames
     i = 0
@@ -1179,6 +3570,7 @@ def imdct(audio_mdct, window_function):
             audio_signal[i : i + window_length] + audio_mdct[:, j]
         )
         i = i + step_length
+    _stage("overlap-add")
 
     # Remove the zero-padding at the start and at the end of the signal
     audio_signal = audio_signal[step_length : -step_length - 1]
@@ -1186,301 +3578,2409 @@ def imdct(audio_mdct, window_function):
     return audio_signal
 
 
-def wavread(audio_file):
+@_profile
+def resample(audio_signal, sampling_frequency, target_sampling_frequency):
     """
-    Read a WAVE file (using SciPy).
+    Resample a signal by a rational factor using a polyphase filter.
 
-    Input:
-        audio_file: path to an audio file
-    Outputs:
-        audio_signal: audio signal (number_samples, number_channels)
-        sampling_frequency: sampling frequency in Hz
-    """
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        sampling_frequency: sampling frequency in Hz (integer)
+        target_sampling_frequency: target sampling frequency in Hz (integer, the signal is returned unchanged if
+            it is the same)
+    Output:
+        audio_signal: resampled audio signal (number_samples*target_sampling_frequency/sampling_frequency,)
 
-    # Read the audio file and return the sampling frequency in Hz and the non-normalized signal using SciPy
-    sampling_frequency, audio_signal = scipy.io.wavfile.read(audio_file)
+    Example: Downsample an audio file to 16 kHz and compute its mel spectrogram.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+        import matplotlib.pyplot as plt
 
-    # Normalize the signal by the data range given the size of an item in bytes
-    audio_signal = audio_signal / pow(2, audio_signal.itemsize * 8 - 1)
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
 
-    return audio_signal, sampling_frequency
+        # Resample the signal to 16 kHz
+        target_sampling_frequency = 16000
+        audio_signal2 = zaf.resample(audio_signal, sampling_frequency, target_sampling_frequency)
 
+        # Set the parameters for the Fourier analysis at the target sampling frequency
+        window_length = pow(2, int(np.ceil(np.log2(0.04*target_sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
 
-def wavwrite(audio_signal, sampling_frequency, audio_file):
-    """
-    Write a WAVE file (using Scipy).
+        # Compute the mel spectrogram (the same as passing the sampling frequencies to zaf.melspectrogram)
+        mel_filterbank = zaf.melfilterbank(target_sampling_frequency, window_length, 128)
+        mel_spectrogram = zaf.melspectrogram(audio_signal2, window_function, step_length, mel_filterbank)
 
-    Inputs:
-        audio_signal: audio signal (number_samples, number_channels)
-        sampling_frequency: sampling frequency in Hz
-    Output:
-        audio_file: path to an audio file
+        # Display the mel spectrogram in dB, seconds, and Hz
+        number_samples = len(audio_signal2)
+        plt.figure(figsize=(14, 5))
+        zaf.melspecshow(mel_spectrogram, number_samples, target_sampling_frequency, window_length, xtick_step=1)
+        plt.title("Mel spectrogram at 16 kHz (dB)")
+        plt.tight_layout()
+        plt.show()
     """
 
-    # Write the audio signal using SciPy
-    scipy.io.wavfile.write(audio_file, sampling_frequency, audio_signal)
+    # Initialize the polyphase resampler (which also checks the sampling frequencies)
+    audio_resampler = Resampler(sampling_frequency, target_sampling_frequency)
 
+    # Return the signal unchanged if the sampling frequencies are the same
+    if audio_resampler.up_factor == 1 and audio_resampler.down_factor == 1:
+        return audio_signal
 
-def sigplot(
-    audio_signal,
-    sampling_frequency,
-    xtick_step=1,
-):
+    # Resample the signal block by block to bound the memory, and flush the resampler at the end
+    block_length = 65536
+    audio_signal = [
+        audio_resampler.process(audio_signal[i : i + block_length])
+        for i in range(0, len(audio_signal), block_length)
+    ]
+    audio_signal.append(audio_resampler.flush())
+    audio_signal = np.concatenate(audio_signal)
+
+    return audio_signal
+
+
+class Resampler:
     """
-    Plot a signal in seconds.
+    Resample a signal by a rational factor using a polyphase filter, one block at a time.
 
     Inputs:
-        audio_signal: audio signal (number_samples, number_channels) (number_channels>=0)
-        sampling_frequency: sampling frequency in Hz
-        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        sampling_frequency: sampling frequency in Hz (integer)
+        target_sampling_frequency: target sampling frequency in Hz (integer)
+    Methods:
+        process(audio_block): resample the next block (number_samples,) and return the available output samples
+        flush(): zero-pad the end of the signal and return the remaining output samples
+
+    The output is aligned with the input (the delay of the low-pass filter is compensated for), so that the
+    concatenation of the outputs of process and flush is the resampled signal.
     """
 
-    # Get the number of samples
-    number_samples = np.shape(audio_signal)[0]
+    def __init__(self, sampling_frequency, target_sampling_frequency):
 
-    # Prepare the tick locations and labels for the x-axis
-    xtick_locations = np.arange(
-        xtick_step * sampling_frequency,
-        number_samples,
-        xtick_step * sampling_frequency,
-    )
-    xtick_labels = np.arange(
-        xtick_step, number_samples / sampling_frequency, xtick_step
-    ).astype(int)
+        # Check the sampling frequencies (integer values in Hz, for an exact rational factor)
+        if sampling_frequency is None:
+            raise ValueError(
+                "A sampling frequency is needed to resample to a target sampling frequency."
+            )
+        for frequency_value in (sampling_frequency, target_sampling_frequency):
+            if frequency_value <= 0 or frequency_value != int(frequency_value):
+                raise ValueError(
+                    f"Invalid sampling frequency {frequency_value!r}, use a positive integer in Hz."
+                )
+
+        # Derive the upsampling and downsampling factors from the ratio of the sampling frequencies
+        resampling_ratio = fractions.Fraction(
+            int(target_sampling_frequency), int(sampling_frequency)
+        )
+        self.up_factor = resampling_ratio.numerator
+        self.down_factor = resampling_ratio.denominator
+
+        # Initialize the sample counts
+        self.number_inputs = 0
+        self.number_outputs = 0
+
+        # Skip the filter if the sampling frequencies are the same (the blocks are then returned unchanged)
+        if self.up_factor == 1 and self.down_factor == 1:
+            return
+
+        # Design the anti-aliasing low-pass filter (Kaiser window, as in SciPy's resample_poly)
+        half_length = 10 * max(self.up_factor, self.down_factor)
+        filter_coefficients = (
+            scipy.signal.firwin(
+                2 * half_length + 1,
+                1 / max(self.up_factor, self.down_factor),
+                window=("kaiser", 5.0),
+            )
+            * self.up_factor
+        )
 
-    # Plot the signal in seconds
-    plt.plot(audio_signal)
-    plt.autoscale(tight=True)
-    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
-    plt.xlabel("Time (s)")
+        # Split the filter into its polyphase components (reversed to be applied to the signal frames)
+        self.number_taps = int(np.ceil(len(filter_coefficients) / self.up_factor))
+        filter_coefficients = np.pad(
+            filter_coefficients,
+            (0, self.number_taps * self.up_factor - len(filter_coefficients)),
+        )
+        self.polyphase_filters = np.ascontiguousarray(
+            filter_coefficients.reshape(self.number_taps, self.up_factor).T[:, ::-1]
+        )
 
+        # Initialize the delay of the filter in upsampled samples and the signal history
+        self.filter_delay = half_length
+        self.signal_history = np.zeros(self.number_taps - 1)
+
+    def process(self, audio_block):
+
+        # Return the block unchanged if the sampling frequencies are the same
+        if self.up_factor == 1 and self.down_factor == 1:
+            self.number_inputs = self.number_inputs + len(audio_block)
+            self.number_outputs = self.number_outputs + len(audio_block)
+            return np.asarray(audio_block)
+
+        # Prepend the signal history to the block, and get the global index of its first sample
+        audio_block = np.concatenate((self.signal_history, audio_block))
+        start_index = self.number_inputs - (self.number_taps - 1)
+        last_index = start_index + len(audio_block) - 1
+
+        # Derive the number of output samples that only depend on the available input samples
+        number_outputs = max(
+            (last_index * self.up_factor + self.up_factor - 1 - self.filter_delay)
+            // self.down_factor
+            + 1
+            - self.number_outputs,
+            0,
+        )
 
-def specshow(
-    audio_spectrogram,
-    number_samples,
-    sampling_frequency,
-    xtick_step=1,
-    ytick_step=1000,
-):
-    """
-    Display a spectrogram in dB, seconds, and Hz.
+        # Initialize the output and frame the extended block (strided view, no copy)
+        audio_output = np.zeros(number_outputs)
+        audio_frames = np.lib.stride_tricks.sliding_window_view(
+            audio_block, self.number_taps
+        )
 
-    Inputs:
-        audio_spectrogram: audio spectrogram (without DC and mirrored frequencies) (number_frequencies, number_times)
-        number_samples: number of samples from the original signal
-        sampling_frequency: sampling frequency from the original signal in Hz
-        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
-        ytick_step: step for the y-axis ticks in Hz (default: 1000 Hz)
-    """
+        # Loop over the polyphase components in output order
+        # (the outputs every up_factor samples share a filter phase and are down_factor input samples apart)
+        for i in range(min(self.up_factor, number_outputs)):
+
+            # Derive the upsampled index, the filter phase, and the index of the first frame
+            upsampled_index = (
+                self.number_outputs + i
+            ) * self.down_factor + self.filter_delay
+            phase_index = upsampled_index % self.up_factor
+            frame_index = (
+                upsampled_index // self.up_factor - start_index - (self.number_taps - 1)
+            )
 
-    # Get the number of frequency channels and time frames
-    number_frequencies, number_times = np.shape(audio_spectrogram)
+            # Filter all the frames of the current phase at once
+            audio_output[i :: self.up_factor] = np.matmul(
+                audio_frames[frame_index :: self.down_factor, :][
+                    0 : len(range(i, number_outputs, self.up_factor))
+                ],
+                self.polyphase_filters[phase_index, :],
+            )
 
-    # Derive the number of seconds and Hertz
-    number_seconds = number_samples / sampling_frequency
-    number_hertz = sampling_frequency / 2
+        # Update the signal history and the sample counts
+        self.signal_history = audio_block[len(audio_block) - (self.number_taps - 1) :]
+        self.number_inputs = (
+            self.number_inputs + len(audio_block) - (self.number_taps - 1)
+        )
+        self.number_outputs = self.number_outputs + number_outputs
 
-    # Derive the number of time frames per second and the number of frequency channels per Hz
-    time_resolution = number_times / number_seconds
-    frequency_resolution = number_frequencies / number_hertz
+        return audio_output
 
-    # Prepare the tick locations and labels for the x-axis
-    xtick_locations = np.arange(
-        xtick_step * time_resolution,
-        number_times,
-        xtick_step * time_resolution,
-    )
-    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
+    def flush(self):
 
-    # Prepare the tick locations and labels for the y-axis
-    ytick_locations = np.arange(
-        ytick_step * frequency_resolution,
-        number_frequencies,
-        ytick_step * frequency_resolution,
-    )
-    ytick_labels = np.arange(ytick_step, number_hertz, ytick_step).astype(int)
+        # Return no samples if the sampling frequencies are the same (nothing is delayed)
+        if self.up_factor == 1 and self.down_factor == 1:
+            return np.zeros(0)
 
-    # Display the spectrogram in dB, seconds, and Hz
-    plt.imshow(
-        20 * np.log10(audio_spectrogram), aspect="auto", cmap="jet", origin="lower"
-    )
-    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
-    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Frequency (Hz)")
+        # Derive the total number of output samples and the input sample needed for the last one
+        total_outputs = int(
+            np.ceil(self.number_inputs * self.up_factor / self.down_factor)
+        )
+        last_index = (
+            (total_outputs - 1) * self.down_factor + self.filter_delay
+        ) // self.up_factor
 
+        # Zero-pad the end of the signal and truncate the output to the total number of samples
+        number_outputs = total_outputs - self.number_outputs
+        audio_output = self.process(
+            np.zeros(max(last_index - self.number_inputs + 1, 0))
+        )[0 : max(number_outputs, 0)]
 
-def melspecshow(
-    mel_spectrogram,
-    number_samples,
-    sampling_frequency,
-    window_length,
-    xtick_step=1,
-):
+        return audio_output
+
+
+class LazySpectrogram:
     """
-    Display a mel spectrogram in dB, seconds, and Hz.
+    Spectrogram view computing its time frames on demand (and caching them by blocks).
 
     Inputs:
-        mel_spectrogram: mel spectrogram (number_mels, number_times)
-        number_samples: number of samples from the original signal
-        sampling_frequency: sampling frequency from the original signal in Hz
-        window_length: window length from the Fourier analysis in number of samples
-        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
-    """
+        audio_signal: audio signal (number_samples,)
+        transform: "stft" (the same as zaf.stft) or "cqt" (the same as zaf.cqtspectrogram) (default: "stft")
+        window_function: window function (window_length,) (for "stft")
+        step_length: step length in samples (for "stft")
+        sampling_frequency: sampling frequency in Hz (for "cqt")
+        time_resolution: number of time frames per second (for "cqt")
+        cqt_kernel: CQT kernel (number_frequencies, fft_length), or CQT filterbank (number_frequencies, window_length/2+1)
+            for an approximate CQT (the same as zaf.cqtspectrogram with zaf.cqtfilterbank) (for "cqt")
+        block_length: number of time frames per computed block (default: 256)
+        cache_size: maximum number of blocks kept in the least recently used (LRU) cache (default: 16)
+    Attributes:
+        shape: (number_frequencies, number_times)
+    Indexing:
+        lazy_spectrogram[:, start_time:end_time] only computes the blocks spanning the time frames
+
+    Example: Display ten seconds in the middle of the CQT spectrogram of a long signal.
+        # Import the needed modules
+        import numpy as np
+        import zaf
+        import matplotlib.pyplot as plt
 
-    # Get the number of mels and time frames
-    number_mels, number_times = np.shape(mel_spectrogram)
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
 
-    # Derive the number of seconds and the number of time frames per second
-    number_seconds = number_samples / sampling_frequency
-    time_resolution = number_times / number_seconds
+        # Compute the CQT kernel
+        octave_resolution = 24
+        minimum_frequency = 55
+        maximum_frequency = 3520
+        cqt_kernel = zaf.cqtkernel(sampling_frequency, octave_resolution, minimum_frequency, maximum_frequency)
 
-    # Derive the minimum and maximum mel
-    minimum_mel = 2595 * np.log10(1 + (sampling_frequency / window_length) / 700)
-    maximum_mel = 2595 * np.log10(1 + (sampling_frequency / 2) / 700)
+        # Create the lazy CQT spectrogram (nothing is computed yet)
+        time_resolution = 25
+        cqt_spectrogram = zaf.LazySpectrogram(audio_signal, transform="cqt", sampling_frequency=sampling_frequency,
+                                              time_resolution=time_resolution, cqt_kernel=cqt_kernel)
 
-    # Compute the mel scale (linearly spaced)
-    mel_scale = np.linspace(minimum_mel, maximum_mel, number_mels)
+        # Compute and display the time frames between 10 and 20 seconds only
+        plt.figure(figsize=(14, 5))
+        zaf.cqtspecshow(cqt_spectrogram[:, 10*time_resolution:20*time_resolution], time_resolution,
+                        octave_resolution, minimum_frequency, xtick_step=1)
+        plt.title("CQT spectrogram between 10 and 20 seconds (dB)")
+        plt.tight_layout()
+        plt.show()
+    """
 
-    # Derive the Hertz scale (log spaced)
-    hertz_scale = 700 * (np.power(10, mel_scale / 2595) - 1)
+    def __init__(
+        self,
+        audio_signal,
+        transform="stft",
+        window_function=None,
+        step_length=None,
+        sampling_frequency=None,
+        time_resolution=None,
+        cqt_kernel=None,
+        block_length=256,
+        cache_size=16,
+    ):
+
+        # Save the signal and the parameters
+        self.audio_signal = audio_signal
+        self.transform = transform
+        self.window_function = window_function
+        self.cqt_kernel = cqt_kernel
+        self.block_length = block_length
+        self.cache_size = cache_size
+        self._block_cache = collections.OrderedDict()
+        number_samples = len(audio_signal)
 
-    # Prepare the tick locations and labels for the x-axis
-    xtick_locations = np.arange(
-        xtick_step * time_resolution,
-        number_times,
-        xtick_step * time_resolution,
-    )
-    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
+        # Derive the framing of zaf.stft or zaf.cqtspectrogram
+        # (frame length, step length, offset of the first frame given the zero-padding, and number of time frames)
+        if transform == "stft":
+            self.frame_length = len(window_function)
+            self.step_length = step_length
+            self.frame_offset = int(np.floor(self.frame_length / 2))
+            number_frequencies = self.frame_length
+            number_times = (
+                int(
+                    np.ceil(
+                        (number_samples + 2 * self.frame_offset - self.frame_length)
+                        / step_length
+                    )
+                )
+                + 1
+            )
+            self.dtype = np.dtype(complex)
+        elif transform == "cqt":
+            number_frequencies, self.frame_length = np.shape(cqt_kernel)
+            if cqt_kernel.dtype.kind != "c":
+                self.frame_length = 2 * (self.frame_length - 1)
+                self.window_function = scipy.signal.windows.hamming(
+                    self.frame_length, sym=False
+                )
+            self.step_length = round(sampling_frequency / time_resolution)
+            self.frame_offset = int(np.ceil((self.frame_length - self.step_length) / 2))
+            number_times = int(np.floor(number_samples / self.step_length))
+            self.dtype = np.dtype(float)
+        else:
+            raise ValueError(f"Unknown transform {transform!r}, use 'stft' or 'cqt'.")
+        self.shape = (number_frequencies, number_times)
+
+    def __getitem__(self, key):
+
+        # Split the key into the frequency and time keys
+        if isinstance(key, tuple):
+            frequency_key, time_key = key
+        else:
+            frequency_key, time_key = key, slice(None)
+
+        # Derive the time indices (without creating all of them for a slice)
+        if isinstance(time_key, slice):
+            time_indices = np.arange(*time_key.indices(self.shape[1]))
+        else:
+            time_indices = np.arange(self.shape[1])[time_key]
+        single_time = np.ndim(time_indices) == 0
+        time_indices = np.atleast_1d(time_indices)
+
+        # Loop over the blocks spanning the time indices
+        audio_spectrogram = np.zeros(
+            (self.shape[0], len(time_indices)), dtype=self.dtype
+        )
+        block_indices = time_indices // self.block_length
+        for block_index in np.unique(block_indices):
+
+            # Gather the time frames from the block (computed or taken from the cache)
+            block_mask = block_indices == block_index
+            audio_spectrogram[:, block_mask] = self._block(block_index)[
+                :, time_indices[block_mask] - block_index * self.block_length
+            ]
+
+        # Apply the frequency key (and drop the time axis for a single time frame)
+        if single_time:
+            return audio_spectrogram[frequency_key, 0]
+        return audio_spectrogram[frequency_key, :]
+
+    def _block(self, block_index):
+
+        # Return the block from the cache if it is there (and mark it as the most recently used)
+        if block_index in self._block_cache:
+            self._block_cache.move_to_end(block_index)
+            return self._block_cache[block_index]
+
+        # Frame the time frames of the block only (zero-padded where they are outside of the signal)
+        start_time = block_index * self.block_length
+        end_time = min(start_time + self.block_length, self.shape[1])
+        audio_frames = _segmentframes(
+            self.audio_signal,
+            self.frame_length,
+            self.step_length,
+            self.frame_offset,
+            start_time,
+            end_time,
+        )
 
-    # Prepare the tick locations and labels for the y-axis
-    ytick_locations = np.arange(0, number_mels, 8)
-    ytick_labels = hertz_scale[::8].astype(int)
+        # Compute the transform of the frames
+        if self.transform == "stft":
+            audio_block = np.fft.fft(audio_frames * self.window_function, axis=1).T
+        elif self.cqt_kernel.dtype.kind != "c":
+            audio_block = np.sqrt(
+                self.cqt_kernel
+                * np.square(
+                    np.absolute(
+                        np.fft.rfft(audio_frames * self.window_function, axis=1)
+                    )
+                ).T
+            )
+        else:
+            audio_block = np.absolute(
+                self.cqt_kernel * np.fft.fft(audio_frames, axis=1).T
+            )
 
-    # Display the mel spectrogram in dB, seconds, and Hz
-    plt.imshow(
-        20 * np.log10(mel_spectrogram), aspect="auto", cmap="jet", origin="lower"
-    )
-    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
-    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Frequency (Hz)")
+        # Save the block in the cache, removing the least recently used one if it is full
+        if self.cache_size > 0:
+            self._block_cache[block_index] = audio_block
+            if len(self._block_cache) > self.cache_size:
+                self._block_cache.popitem(last=False)
 
+        return audio_block
 
-def mfccshow(
-    audio_mfcc,
-    number_samples,
-    sampling_frequency,
-    xtick_step=1,
+
+@_profile
+def wavread(
+    audio_file,
+    data_type=np.float64,
+    channel_indices=None,
+    start_sample=0,
+    end_sample=None,
 ):
     """
-    Display MFCCs in seconds.
+    Read a WAVE file (8, 16, 24, or 32-bit PCM, or 32 or 64-bit float), decoding only the requested part.
 
     Inputs:
-        audio_mfcc: audio MFCCs (number_coefficients, number_times)
-        number_samples: number of samples from the original signal
-        sampling_frequency: sampling frequency from the original signal in Hz
-        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        audio_file: path to an audio file
+        data_type: data type of the normalized signal (e.g., np.float32 to halve the memory) (default: np.float64)
+        channel_indices: indices of the channels to read, or index of a single channel to read as a one-dimensional
+            signal (default: None, i.e., all the channels)
+        start_sample: index of the first sample to read (default: 0)
+        end_sample: index of the last sample to read (excluded) (default: None, i.e., until the end)
+    Outputs:
+        audio_signal: audio signal (number_samples, number_channels) or (number_samples,) for a mono file or a
+            single channel index
+        sampling_frequency: sampling frequency in Hz
     """
 
-    # Get the number of time frames
-    number_times = np.shape(audio_mfcc)[1]
+    # Read the format and the location of the data from the RIFF header
+    (
+        format_tag,
+        number_channels,
+        sampling_frequency,
+        number_bits,
+        data_offset,
+        number_samples,
+    ) = _wavheader(audio_file)
+    _stage("header")
+
+    # Clip the sample range to the data, and derive the channels to read
+    start_sample = min(max(start_sample, 0), number_samples)
+    end_sample = (
+        number_samples
+        if end_sample is None
+        else min(max(end_sample, start_sample), number_samples)
+    )
+    if channel_indices is None:
+        channel_indices = np.arange(number_channels)
+    single_channel = np.ndim(channel_indices) == 0
+    channel_indices = np.atleast_1d(channel_indices)
+    number_bytes = number_bits // 8
+
+    # Memory-map only the sample range, as (number_samples, number_channels, number_bytes) bytes
+    if end_sample > start_sample:
+        audio_bytes = np.memmap(
+            audio_file,
+            dtype=np.uint8,
+            mode="r",
+            offset=data_offset + start_sample * number_channels * number_bytes,
+            shape=(end_sample - start_sample, number_channels, number_bytes),
+        )
+    else:
+        audio_bytes = np.zeros((0, number_channels, number_bytes), dtype=np.uint8)
+
+    # Copy the bytes of the requested channels only (the other channels are never decoded)
+    audio_bytes = np.ascontiguousarray(audio_bytes[:, channel_indices, :])
+    _stage("read")
+
+    # Decode the 24-bit samples by placing their 3 bytes in the upper bytes of 32-bit integers (sign included)
+    if format_tag == 1 and number_bits == 24:
+        audio_signal = np.zeros(np.shape(audio_bytes)[0:2] + (4,), dtype=np.uint8)
+        audio_signal[:, :, 1:4] = audio_bytes
+        audio_signal = audio_signal.view("<i4")[:, :, 0]
+        number_bits = 32
+
+    # Reinterpret the other samples as their native type (without copying)
+    else:
+        native_type = {
+            (1, 8): "u1",
+            (1, 16): "<i2",
+            (1, 32): "<i4",
+            (3, 32): "<f4",
+            (3, 64): "<f8",
+        }[(format_tag, number_bits)]
+        audio_signal = audio_bytes.view(native_type)[:, :, 0]
+
+    # Convert to the data type and normalize in place (unsigned 8-bit samples are centered on 128)
+    audio_signal = audio_signal.astype(data_type)
+    if format_tag == 1:
+        if number_bits == 8:
+            audio_signal -= 128
+        audio_signal *= np.asarray(1 / pow(2, number_bits - 1), dtype=data_type)
+    _stage("normalization")
+
+    # Return a one-dimensional signal for a mono file when all the channels are read, or for a single channel index
+    if single_channel or (number_channels == 1 and np.size(channel_indices) == 1):
+        audio_signal = audio_signal[:, 0]
 
-    # Derive the number of seconds and the number of time frames per second
-    number_seconds = number_samples / sampling_frequency
-    time_resolution = number_times / number_seconds
+    return audio_signal, sampling_frequency
 
-    # Prepare the tick locations and labels for the x-axis
-    xtick_locations = np.arange(
-        xtick_step * time_resolution,
-        number_times,
-        xtick_step * time_resolution,
-    )
-    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
 
-    # Display the MFCCs in seconds
-    plt.imshow(audio_mfcc, aspect="auto", cmap="jet", origin="lower")
-    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Coefficients")
+@_profile
+def wavwrite(audio_signal, sampling_frequency, audio_file, sample_format=None):
+    """
+    Write a WAVE file (using Scipy).
 
+    Inputs:
+        audio_signal: audio signal (number_samples, number_channels)
+        sampling_frequency: sampling frequency in Hz
+        sample_format: "int16", "int24", "int32", or "float32" to convert the (normalized) signal
+            (default: None, i.e., the data type of the signal using SciPy)
+    Output:
+        audio_file: path to an audio file
+    """
 
-def cqtspecshow(
-    cqt_spectrogram,
-    time_resolution,
-    octave_resolution,
-    minimum_frequency,
-    xtick_step=1,
+    # Write the audio signal converted to the sample format using the WAVE writer, if given
+    if sample_format is not None:
+        number_channels = 1 if np.ndim(audio_signal) == 1 else np.shape(audio_signal)[1]
+        with WavWriter(
+            audio_file, sampling_frequency, number_channels, sample_format
+        ) as wav_writer:
+            wav_writer.write(audio_signal)
+        return
+
+    # Write the audio signal using SciPy
+    scipy.io.wavfile.write(audio_file, sampling_frequency, audio_signal)
+
+
+class WavWriter:
+    """
+    Write a WAVE file block by block, converting the (normalized) signal to integer or float samples.
+
+    Inputs:
+        audio_file: path to an audio file
+        sampling_frequency: sampling frequency in Hz
+        number_channels: number of channels (default: 1)
+        sample_format: "int16", "int24", "int32", or "float32" (integers are clipped, floats are not) (default: "int16")
+            (written as WAVE_FORMAT_EXTENSIBLE for integers of more than 16 bits or more than 2 channels, and with
+            a fact chunk for floats, as required by the WAVE specification)
+        dither: add triangular (TPDF) dither of one least significant bit before rounding to integers (default: False)
+    Methods:
+        write(audio_block): convert and write the next block (number_samples, number_channels) or (number_samples,)
+        close(): write the sizes in the RIFF header and close the file (also when leaving a with block)
+
+    Example: Resynthesize a signal from its MDCT and write it block by block in 16-bit PCM.
+        # Import the needed modules
+        import numpy as np
+        import zaf
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the MDCT with a slope function as used in the Vorbis audio coding format
+        window_length = 2048
+        window_function = np.sin(np.pi/2*pow(np.sin(np.pi/window_length*np.arange(0.5, window_length+0.5)), 2))
+        audio_mdct = zaf.mdct(audio_signal, window_function)
+
+        # Resynthesize and write the signal one second at a time
+        with zaf.WavWriter("resynthesized_file.wav", sampling_frequency, sample_format="int16") as wav_writer:
+            audio_signal2 = zaf.imdct(audio_mdct, window_function)[0:len(audio_signal)]
+            for i in range(0, len(audio_signal2), sampling_frequency):
+                wav_writer.write(audio_signal2[i:i+sampling_frequency])
+    """
+
+    def __init__(
+        self,
+        audio_file,
+        sampling_frequency,
+        number_channels=1,
+        sample_format="int16",
+        dither=False,
+    ):
+
+        # Derive the number of bits per sample and the format tag (1 for PCM, 3 for IEEE float)
+        if sample_format not in ("int16", "int24", "int32", "float32"):
+            raise ValueError(
+                f"Unknown sample format {sample_format!r}, use 'int16', 'int24', 'int32', or 'float32'."
+            )
+        self.number_bits = int(sample_format[-2:])
+        format_tag = 3 if sample_format == "float32" else 1
+        self.sample_format = sample_format
+        self.number_channels = number_channels
+        self.dither = dither
+        self.data_size = 0
+
+        # Derive the common part of the format chunk (WAVE_FORMAT_EXTENSIBLE for integers of more than 16 bits or
+        # more than 2 channels, as required by the WAVE specification)
+        extensible_format = (format_tag == 1 and self.number_bits > 16) or (
+            number_channels > 2
+        )
+        self.block_align = number_channels * self.number_bits // 8
+        format_chunk = (
+            np.array(
+                [0xFFFE if extensible_format else format_tag, number_channels],
+                dtype="<u2",
+            ).tobytes()
+            + np.array(
+                [sampling_frequency, sampling_frequency * self.block_align],
+                dtype="<u4",
+            ).tobytes()
+            + np.array([self.block_align, self.number_bits], dtype="<u2").tobytes()
+        )
+
+        # Extend it for WAVE_FORMAT_EXTENSIBLE (valid bits, speaker positions of the channels for mono and stereo,
+        # and sub-format GUID starting with the format tag), or with an empty extension for floats
+        if extensible_format:
+            format_chunk = (
+                format_chunk
+                + np.array([22, self.number_bits], dtype="<u2").tobytes()
+                + np.array(
+                    [{1: 0x4, 2: 0x3}.get(number_channels, 0)], dtype="<u4"
+                ).tobytes()
+                + np.array([format_tag], dtype="<u2").tobytes()
+                + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+            )
+        elif format_tag == 3:
+            format_chunk = format_chunk + np.array([0], dtype="<u2").tobytes()
+
+        # Open the file and write the RIFF header with placeholder sizes (patched when closing), with a fact chunk
+        # for the number of samples per channel if the samples are floats
+        self.file_object = open(audio_file, "wb")
+        self.file_object.write(b"RIFF" + np.array([0], dtype="<u4").tobytes() + b"WAVE")
+        self.file_object.write(
+            b"fmt "
+            + np.array([len(format_chunk)], dtype="<u4").tobytes()
+            + format_chunk
+        )
+        self.fact_offset = None
+        if format_tag == 3:
+            self.fact_offset = self.file_object.tell() + 8
+            self.file_object.write(b"fact" + np.array([4, 0], dtype="<u4").tobytes())
+        self.file_object.write(b"data" + np.array([0], dtype="<u4").tobytes())
+        self.data_offset = self.file_object.tell()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exception_info):
+
+        self.close()
+
+    def write(self, audio_block):
+
+        # Check the number of channels of the block (one sample per channel for every time sample)
+        audio_block = np.asarray(audio_block)
+        block_channels = 1 if np.ndim(audio_block) == 1 else np.shape(audio_block)[-1]
+        if np.ndim(audio_block) > 2 or block_channels != self.number_channels:
+            raise ValueError(
+                f"The block has the shape {np.shape(audio_block)}, use (number_samples, {self.number_channels})"
+                + (" or (number_samples,)." if self.number_channels == 1 else ".")
+            )
+
+        # Write the float samples directly as 32-bit floats
+        if self.sample_format == "float32":
+            audio_bytes = np.asarray(audio_block, dtype="<f4").tobytes()
+
+        else:
+
+            # Scale the signal to the integer range, and add the TPDF dither if needed
+            maximum_value = pow(2, self.number_bits - 1)
+            audio_block = np.asarray(audio_block) * maximum_value
+            if self.dither:
+                audio_block = (
+                    audio_block
+                    + np.random.rand(*np.shape(audio_block))
+                    - np.random.rand(*np.shape(audio_block))
+                )
+
+            # Round and clip the samples to the integer range (vectorized, no loop over the samples)
+            audio_block = np.clip(
+                np.round(audio_block), -maximum_value, maximum_value - 1
+            )
+
+            # Convert to little-endian integers, keeping only the 3 lower bytes of the 32-bit integers for 24 bits
+            if self.number_bits == 24:
+                audio_bytes = (
+                    audio_block.astype("<i4")
+                    .reshape(-1, 1)
+                    .view(np.uint8)[:, 0:3]
+                    .tobytes()
+                )
+            else:
+                audio_bytes = audio_block.astype(f"<i{self.number_bits // 8}").tobytes()
+
+        # Write the samples (interleaved channels, as they are stored in the array)
+        self.file_object.write(audio_bytes)
+        self.data_size = self.data_size + len(audio_bytes)
+
+    def close(self):
+
+        # Skip if the file is already closed
+        if self.file_object.closed:
+            return
+
+        # Pad the data to an even size as required by RIFF
+        if self.data_size % 2 == 1:
+            self.file_object.write(b"\x00")
+
+        # Patch the sizes of the RIFF and data chunks (and the number of samples of the fact chunk) in the header,
+        # and close the file
+        self.file_object.seek(4)
+        self.file_object.write(
+            np.array(
+                [self.data_offset - 8 + self.data_size + self.data_size % 2],
+                dtype="<u4",
+            ).tobytes()
+        )
+        if self.fact_offset is not None:
+            self.file_object.seek(self.fact_offset)
+            self.file_object.write(
+                np.array([self.data_size // self.block_align], dtype="<u4").tobytes()
+            )
+        self.file_object.seek(self.data_offset - 4)
+        self.file_object.write(np.array([self.data_size], dtype="<u4").tobytes())
+        self.file_object.close()
+
+
+@_profile
+def featwrite(
+    audio_features, time_resolution, feature_file, parameters=None, block_length=256
 ):
     """
-    Display a CQT spectrogram in dB, seconds, and Hz.
+    Write features into an indexed feature file.
 
     Inputs:
-        cqt_spectrogram: CQT spectrogram (number_frequencies, number_times)
+        audio_features: audio features (number_features, number_times)
         time_resolution: number of time frames per second
-        octave_resolution: number of frequency channels per octave
-        minimum_frequency: minimum frequency in Hz
-        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        feature_file: path to a feature file
+        parameters: analysis parameters (JSON-serializable dictionary, NumPy scalars and arrays allowed) (default: None)
+        block_length: number of time frames per block (default: 256)
+
+    Example: Store the MFCCs of an audio file and read back two seconds of them.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the MFCCs
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        number_mels = 40
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, number_mels)
+        number_coefficients = 20
+        audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, number_coefficients)
+
+        # Write the MFCCs with their analysis parameters
+        time_resolution = sampling_frequency/step_length
+        parameters = {"sampling_frequency": sampling_frequency, "window_length": window_length,
+                      "step_length": step_length, "number_mels": number_mels}
+        zaf.featwrite(audio_mfcc, time_resolution, "mfcc_file.zaf", parameters)
+
+        # Read the MFCCs between 10 and 12 seconds only
+        audio_mfcc2, time_resolution, parameters = zaf.featread("mfcc_file.zaf", 10, 12)
     """
 
-    # Get the number of frequency channels and time frames
-    number_frequencies, number_times = np.shape(cqt_spectrogram)
+    # Get the number of features and time frames
+    number_features, number_times = np.shape(audio_features)
+
+    # Derive the number of blocks and the block offsets in bytes from the start of the data
+    # (the features are stored time-major so that every block is contiguous)
+    number_blocks = int(np.ceil(number_times / block_length))
+    block_size = block_length * number_features * audio_features.itemsize
+    block_offsets = [i * block_size for i in range(number_blocks)]
+
+    # Convert the analysis parameters to JSON types (NumPy scalars and arrays included)
+    if parameters is None:
+        parameters = {}
+    parameters = {
+        parameter_name: _jsonvalue(parameter_value, parameter_name)
+        for parameter_name, parameter_value in parameters.items()
+    }
+
+    # Prepare the header with the layout of the data and the analysis parameters
+    feature_header = {
+        "dtype": audio_features.dtype.str,
+        "number_features": number_features,
+        "number_times": number_times,
+        "time_resolution": time_resolution,
+        "block_length": block_length,
+        "block_offsets": block_offsets,
+        "parameters": parameters,
+    }
+    feature_header = json.dumps(feature_header)
+    feature_header = feature_header.encode("utf-8")
+
+    # Pad the header with spaces to align the start of the data on 64 bytes
+    header_length = len(feature_header) + (-len(feature_header) - 16) % 64
+    feature_header = feature_header.ljust(header_length)
+
+    # Write the magic string, the header length, the header, and the time-major data
+    with open(feature_file, "wb") as file_object:
+        file_object.write(b"ZAFFEAT1")
+        file_object.write(np.array([header_length], dtype="<u8").tobytes())
+        file_object.write(feature_header)
+        file_object.write(np.ascontiguousarray(audio_features.T).tobytes())
+
+
+@_profile
+def featread(feature_file, start_time=0, end_time=None):
+    """
+    Read a time range of features from an indexed feature file (memory-mapped).
 
-    # Prepare the tick locations and labels for the x-axis
-    xtick_locations = np.arange(
-        xtick_step * time_resolution,
-        number_times,
-        xtick_step * time_resolution,
+    Inputs:
+        feature_file: path to a feature file
+        start_time: start time in seconds (default: 0 second)
+        end_time: end time in seconds (default: None, i.e., until the end)
+    Outputs:
+        audio_features: audio features (number_features, number_times)
+        time_resolution: number of time frames per second
+        parameters: analysis parameters (dictionary)
+
+    Example: Read and display 30 seconds of MFCCs from a feature file (written as in the example of zaf.featwrite).
+        # Import the needed modules
+        import numpy as np
+        import zaf
+        import matplotlib.pyplot as plt
+
+        # Read the MFCCs between 10 and 40 seconds only (memory-mapping the blocks spanning them)
+        audio_mfcc, time_resolution, parameters = zaf.featread("mfcc_file.zaf", 10, 40)
+
+        # Display the MFCCs in seconds, with the analysis parameters in the title
+        number_coefficients, number_times = np.shape(audio_mfcc)
+        plt.figure(figsize=(14, 4))
+        plt.imshow(audio_mfcc, aspect="auto", cmap="jet", origin="lower",
+                   extent=(10, 10+number_times/time_resolution, 0.5, number_coefficients+0.5))
+        plt.title(f"MFCCs ({parameters['number_mels']} mels, window of {parameters['window_length']} samples)")
+        plt.xlabel("Time (s)")
+        plt.ylabel("Coefficient")
+        plt.tight_layout()
+        plt.show()
+    """
+
+    # Read the magic string, the header length, and the header
+    with open(feature_file, "rb") as file_object:
+        if file_object.read(8) != b"ZAFFEAT1":
+            raise ValueError(f"{feature_file} is not a zaf feature file.")
+        header_length = int(np.frombuffer(file_object.read(8), dtype="<u8")[0])
+        feature_header = json.loads(file_object.read(header_length))
+    _stage("header")
+
+    # Get the layout of the data
+    number_features = feature_header["number_features"]
+    number_times = feature_header["number_times"]
+    time_resolution = feature_header["time_resolution"]
+    block_length = feature_header["block_length"]
+
+    # Derive the first and last time frames (excluded) and clip them to the data
+    start_index = min(max(int(np.floor(start_time * time_resolution)), 0), number_times)
+    if end_time is None:
+        end_index = number_times
+    else:
+        end_index = min(
+            max(int(np.ceil(end_time * time_resolution)), start_index), number_times
+        )
+
+    # Return empty features if the time range does not contain any time frame
+    if start_index == end_index:
+        audio_features = np.zeros(
+            (number_features, 0), dtype=np.dtype(feature_header["dtype"])
+        )
+        return audio_features, time_resolution, feature_header["parameters"]
+
+    # Derive the first and last blocks and the number of time frames they span
+    first_block = start_index // block_length
+    last_block = (end_index - 1) // block_length
+    block_times = min((last_block + 1) * block_length, number_times) - (
+        first_block * block_length
     )
-    xtick_labels = np.arange(
-        xtick_step, number_times / time_resolution, xtick_step
-    ).astype(int)
 
-    # Prepare the tick locations and labels for the y-axis
-    ytick_locations = np.arange(0, number_frequencies, octave_resolution)
-    ytick_labels = (
-        minimum_frequency * pow(2, ytick_locations / octave_resolution)
-    ).astype(int)
+    # Memory-map only the blocks that span the time range (one seek, no full read)
+    audio_features = np.memmap(
+        feature_file,
+        dtype=np.dtype(feature_header["dtype"]),
+        mode="r",
+        offset=16 + header_length + feature_header["block_offsets"][first_block],
+        shape=(block_times, number_features),
+    )
 
-    # Display the CQT spectrogram in dB and seconds, and Hz
-    plt.imshow(
-        20 * np.log10(cqt_spectrogram), aspect="auto", cmap="jet", origin="lower"
+    # Crop the time frames and copy them back to a (number_features, number_times) array
+    audio_features = np.array(
+        audio_features[
+            start_index
+            - first_block * block_length : end_index
+            - first_block * block_length,
+            :,
+        ].T
     )
-    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
-    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
-    plt.xlabel("Time (s)")
-    plt.ylabel("Frequency (Hz)")
+    _stage("data")
 
+    return audio_features, time_resolution, feature_header["parameters"]
 
-def cqtchromshow(
-    cqt_chromagram,
-    time_resolution,
+
+@_profile
+def dequantize(audio_features, feature_scale, feature_offset):
+    """
+    Dequantize features quantized in dB (e.g., by zaf.melspectrogram or zaf.cqtspectrogram) back to dB.
+
+    Inputs:
+        audio_features: quantized audio features (float16, uint8, or uint16) (number_features, number_times)
+        feature_scale: scale in dB of the quantized values
+        feature_offset: offset in dB of the quantized values
+    Output:
+        audio_features: audio features in dB (number_features, number_times)
+            (the error is at most feature_scale/2 for uint8 and uint16 and |dB|/2048 for float16, above the clipped
+            dynamic range; e.g., 0.16 dB for uint8 and 0.0006 dB for uint16 with a dynamic range of 80 dB)
+
+    Example: Store the mel spectrogram of an audio file in uint8 and read it back in dB.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Compute the mel spectrogram in dB quantized to uint8 (8 times smaller than float64)
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 128)
+        mel_spectrogram, output_info = zaf.melspectrogram(
+            audio_signal, window_function, step_length, mel_filterbank, quantization="uint8")
+
+        # Write the quantized mel spectrogram with its scale and offset
+        time_resolution = sampling_frequency/step_length
+        parameters = {"feature_scale": output_info["feature_scale"], "feature_offset": output_info["feature_offset"]}
+        zaf.featwrite(mel_spectrogram, time_resolution, "mel_file.zaf", parameters)
+
+        # Read the mel spectrogram back and dequantize it to dB
+        mel_spectrogram, time_resolution, parameters = zaf.featread("mel_file.zaf")
+        mel_spectrogram = zaf.dequantize(mel_spectrogram, parameters["feature_scale"], parameters["feature_offset"])
+    """
+
+    # Map the quantized values back to dB (in float64)
+    audio_features = (
+        np.asarray(audio_features, dtype=float) * feature_scale + feature_offset
+    )
+    _stage("dequantization")
+
+    return audio_features
+
+
+@_profile
+def batchextract(
+    audio_files,
+    output_directory,
+    compute_features="mfcc",
+    shard="0/1",
+    checkpoint_file=None,
+    report_interval=10,
+    prefetch_length=2,
+    workers=1,
+    input_directory=None,
+    verbose=False,
+):
+    """
+    Extract features from a list of audio files into feature files, in shards and resumable.
+
+    Inputs:
+        audio_files: paths to audio files, or path to a manifest file (one path per line)
+        output_directory: path to the directory of the feature files (mirroring the directories of the audio files
+            under the input directory, with the extension .zaf, so two audio files differing only in their
+            extension are rejected)
+        compute_features: "mfcc" or "cqtchromagram" (with the parameters of their examples), or function
+            (audio_signal, sampling_frequency) -> (audio_features, time_resolution) (default: "mfcc")
+        shard: "i/N" to process only the i-th of N shards (from 0), given by a hash of the paths (default: "0/1")
+        checkpoint_file: path to the checkpoint manifest of the completed audio files
+            (default: None, i.e., "checkpoint_i_of_N.txt" in the output directory)
+        report_interval: minimum number of seconds between two progress reports (default: 10)
+        prefetch_length: number of audio files read ahead and of feature files waiting to be written (default: 2)
+        workers: number of threads computing the features (default: 1)
+        input_directory: path to the directory containing all the audio files, mirrored in the output directory
+            (default: None, i.e., the current directory)
+        verbose: print the progress reports (default: False)
+    Output:
+        failed_files: error messages of the audio files which could not be processed {audio_file: message}
+
+    Example: Extract the MFCCs of a corpus on 4 nodes, and resume after a crash by running the same command.
+        # Import the needed modules
+        import sys
+        import zaf
+
+        # Process the shard of this node (e.g., "python extract.py 2/4") and print the failed files
+        failed_files = zaf.batchextract("manifest.txt", "mfcc_files", "mfcc", shard=sys.argv[1],
+                                        input_directory="audio_files", verbose=True)
+        print(failed_files)
+
+        # Or equivalently, from the command line
+        # python zaf.py manifest.txt mfcc_files --features mfcc --shard 2/4 --input-directory audio_files
+    """
+
+    # Read the paths in the manifest file (skipping the empty lines), if a manifest is given
+    if isinstance(audio_files, str):
+        with open(audio_files) as file_object:
+            audio_files = [line.strip() for line in file_object if line.strip()]
+
+    # Parse the shard index and number of shards
+    shard_index, number_shards = [int(shard_part) for shard_part in shard.split("/")]
+    if number_shards < 1 or not 0 <= shard_index < number_shards:
+        raise ValueError(f"Invalid shard {shard!r}, use 'i/N' with 0 <= i < N.")
+
+    # Get the function computing the features
+    if isinstance(compute_features, str):
+        compute_features = functools.partial(
+            _batchfeatures, feature_name=compute_features
+        )
+
+    # Derive the paths of the feature files, mirroring the paths of the audio files under the input directory
+    # (so they do not depend on the other audio files), and check that they are all in it and that no two audio
+    # files map to the same feature file (e.g., with the same name but different extensions), for all the shards
+    if input_directory is None:
+        input_directory = os.getcwd()
+    feature_files = {}
+    audio_sources = {}
+    for audio_file in audio_files:
+        relative_path = os.path.relpath(
+            os.path.splitext(os.path.abspath(audio_file))[0],
+            os.path.abspath(input_directory),
+        )
+        if relative_path.split(os.sep)[0] == os.pardir:
+            raise ValueError(
+                f"{audio_file} is not in the input directory {input_directory}."
+            )
+        feature_file = os.path.join(output_directory, relative_path + ".zaf")
+        if audio_sources.setdefault(feature_file, audio_file) != audio_file:
+            raise ValueError(
+                f"{audio_sources[feature_file]} and {audio_file} have the same feature file {feature_file}."
+            )
+        feature_files[audio_file] = feature_file
+
+    # Keep the audio files of the shard using a stable hash of their paths (no coordination between the shards)
+    audio_files = [
+        audio_file
+        for audio_file in audio_files
+        if zlib.crc32(audio_file.encode()) % number_shards == shard_index
+    ]
+    number_files = len(audio_files)
+
+    # Read the audio files completed in a previous run, and skip them
+    if checkpoint_file is None:
+        checkpoint_file = os.path.join(
+            output_directory, f"checkpoint_{shard_index}_of_{number_shards}.txt"
+        )
+    completed_files = set()
+    if os.path.isfile(checkpoint_file):
+        with open(checkpoint_file) as file_object:
+            completed_files = set(line.rstrip("\n") for line in file_object)
+    pending_files = [
+        audio_file for audio_file in audio_files if audio_file not in completed_files
+    ]
+    number_completed = number_files - len(pending_files)
+    _stage("manifest")
+
+    # Read an audio signal and average it over its channels
+    def read_audio(audio_file):
+        audio_signal, sampling_frequency = wavread(audio_file)
+        if np.ndim(audio_signal) == 2:
+            audio_signal = np.mean(audio_signal, 1)
+        return audio_signal, sampling_frequency
+
+    # Compute the features of an audio signal (keeping only its duration)
+    def compute_audio(audio_file, audio_data):
+        audio_signal, sampling_frequency = audio_data
+        audio_features, time_resolution = compute_features(
+            audio_signal, sampling_frequency
+        )
+        return (
+            audio_features,
+            time_resolution,
+            sampling_frequency,
+            len(audio_signal) / sampling_frequency,
+        )
+
+    # Write the features in a temporary file, rename it (atomic, so a crash never leaves a partial file), and add
+    # the audio file to the checkpoint manifest (flushed to the disk)
+    def write_features(audio_file, audio_result):
+        nonlocal audio_duration
+        audio_features, time_resolution, sampling_frequency, file_duration = (
+            audio_result
+        )
+        feature_file = feature_files[audio_file]
+        os.makedirs(os.path.dirname(feature_file), exist_ok=True)
+        temporary_file = f"{feature_file}.{os.getpid()}.tmp"
+        try:
+            featwrite(
+                audio_features,
+                time_resolution,
+                temporary_file,
+                {"audio_file": audio_file, "sampling_frequency": sampling_frequency},
+            )
+            os.replace(temporary_file, feature_file)
+        finally:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+        checkpoint_object.write(audio_file + "\n")
+        checkpoint_object.flush()
+        os.fsync(checkpoint_object.fileno())
+        audio_duration = audio_duration + file_duration
+
+    # Report the throughput and the estimated time remaining (if verbose)
+    def report_progress(number_processed, failed_files):
+        nonlocal report_time
+        current_time = time.perf_counter()
+        if not verbose or (
+            current_time - report_time < report_interval
+            and number_processed < len(pending_files)
+        ):
+            return
+        elapsed_time = current_time - start_time
+        file_rate = number_processed / elapsed_time
+        print(
+            f"Shard {shard_index}/{number_shards}: "
+            f"{number_completed + number_processed}/{number_files} files, "
+            f"{len(failed_files)} failed, {file_rate:.2f} files/s, "
+            f"{audio_duration / elapsed_time:.1f} s of audio/s, "
+            f"ETA {(len(pending_files) - number_processed) / file_rate:.0f} s",
+            flush=True,
+        )
+        report_time = current_time
+
+    # Read, compute, and write the pending audio files in a pipeline (the failed ones are recorded and skipped)
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_file)), exist_ok=True)
+    audio_duration = 0
+    start_time = time.perf_counter()
+    report_time = start_time
+    with open(checkpoint_file, "a") as checkpoint_object:
+        failed_files = pipeline(
+            pending_files,
+            read_audio,
+            compute_audio,
+            write_features,
+            prefetch_length,
+            workers,
+            report_progress,
+        )
+    _stage("extraction")
+
+    return failed_files
+
+
+@_profile
+def pipeline(
+    items,
+    read_function,
+    compute_function,
+    write_function,
+    prefetch_length=4,
+    workers=1,
+    report_function=None,
+):
+    """
+    Read, compute, and write items in a pipeline, overlapping the disk reads, the computations, and the disk writes.
+
+    Inputs:
+        items: items to process (e.g., paths to audio files)
+        read_function: function item -> data, called in a background reader thread
+        compute_function: function (item, data) -> result, called in the current thread or in a pool of threads
+        write_function: function (item, result), called in a background writer thread (in the order of the items)
+        prefetch_length: maximum number of items waiting to be computed and to be written (bounding the memory)
+            (default: 4)
+        workers: number of threads computing the results (default: 1, i.e., in the current thread)
+        report_function: function (number_processed, failed_items), called in the writer thread after each item
+            (its first error stops the reports and is raised once all the items are written) (default: None)
+    Output:
+        failed_items: error messages of the items which failed at any stage {item: message}
+
+    Example: Compute the MFCCs of audio files while the next ones are read and the previous ones are written.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+
+        # Set the parameters for the MFCCs (for audio files at 44,100 Hz)
+        window_function = scipy.signal.hamming(2048, sym=False)
+        mel_filterbank = zaf.melfilterbank(44100, 2048, 40)
+
+        # Read the audio signals, compute their MFCCs using 4 threads, and write them in numpy files
+        audio_files = ["audio_file1.wav", "audio_file2.wav", "audio_file3.wav"]
+        failed_items = zaf.pipeline(
+            audio_files,
+            lambda audio_file: np.mean(zaf.wavread(audio_file)[0], 1),
+            lambda audio_file, audio_signal: zaf.mfcc(audio_signal, window_function, 1024, mel_filterbank, 20),
+            lambda audio_file, audio_mfcc: np.save(audio_file + ".npy", audio_mfcc),
+            workers=4,
+        )
+    """
+
+    # Initialize the bounded queues between the stages (a full queue blocks the stage before it)
+    read_queue = queue.Queue(prefetch_length)
+    write_queue = queue.Queue(prefetch_length)
+    end_marker = object()
+    failed_items = {}
+    thread_errors = []
+
+    # Read the items in the background, passing the errors along with the items to keep their order
+    # (an error while iterating over the items is recorded, and the end marker is always sent)
+    def read_items():
+        try:
+            for item in items:
+                try:
+                    read_queue.put((item, read_function(item), None))
+                except Exception as error:
+                    read_queue.put((item, None, error))
+        except Exception as items_error:
+            thread_errors.append(items_error)
+        finally:
+            read_queue.put(end_marker)
+
+    # Compute the result of an item, passing the errors along
+    def compute_item(item, data, error):
+        if error is not None:
+            return item, None, error
+        try:
+            return item, compute_function(item, data), None
+        except Exception as error:
+            return item, None, error
+
+    # Write the results in the background in the order of the items, recording the errors
+    # (an error of the report function is recorded and stops the reports, but the queue is still drained until the
+    # end marker so that the main thread never blocks)
+    def write_items():
+        number_processed = 0
+        while True:
+            queue_entry = write_queue.get()
+            if queue_entry is end_marker:
+                return
+            item, result, error = queue_entry
+            if error is None:
+                try:
+                    write_function(item, result)
+                except Exception as write_error:
+                    error = write_error
+            if error is not None:
+                failed_items[item] = f"{type(error).__name__}: {error}"
+            number_processed = number_processed + 1
+            if report_function is not None and not thread_errors:
+                try:
+                    report_function(number_processed, failed_items)
+                except Exception as report_error:
+                    thread_errors.append(report_error)
+
+    # Start the reader and the writer threads
+    reader_thread = threading.Thread(target=read_items, daemon=True)
+    writer_thread = threading.Thread(target=write_items, daemon=True)
+    reader_thread.start()
+    writer_thread.start()
+
+    # Compute the items in the current thread if there is only one worker
+    if workers == 1:
+        for queue_entry in iter(read_queue.get, end_marker):
+            write_queue.put(compute_item(*queue_entry))
+
+    # Otherwise, compute them in a thread pool, keeping at most 2 items per worker in flight and passing the
+    # computed ones to the writer as soon as they are next in order
+    else:
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            pending_futures = collections.deque()
+            for queue_entry in iter(read_queue.get, end_marker):
+                pending_futures.append(executor.submit(compute_item, *queue_entry))
+                while pending_futures and (
+                    pending_futures[0].done() or len(pending_futures) >= 2 * workers
+                ):
+                    write_queue.put(pending_futures.popleft().result())
+            while pending_futures:
+                write_queue.put(pending_futures.popleft().result())
+    reader_thread.join()
+    _stage("compute")
+
+    # Wait for the writer to finish, and raise the error of the reader or the writer thread (if any)
+    write_queue.put(end_marker)
+    writer_thread.join()
+    _stage("write")
+    if thread_errors:
+        raise thread_errors[0]
+
+    return failed_items
+
+
+@_profile
+def sigplot(
+    audio_signal,
+    sampling_frequency,
     xtick_step=1,
 ):
     """
-    Display a CQT chromagram in seconds.
+    Plot a signal in seconds.
 
     Inputs:
-        audio_chromagram: CQT chromagram (number_chromas, number_times)
-        time_resolution: number of time frames per second
+        audio_signal: audio signal (number_samples, number_channels) (number_channels>=0)
+        sampling_frequency: sampling frequency in Hz
         xtick_step: step for the x-axis ticks in seconds (default: 1 second)
     """
 
-    # Get the number of time frames
-    number_times = np.shape(cqt_chromagram)[1]
+    # Get the number of samples
+    number_samples = np.shape(audio_signal)[0]
 
     # Prepare the tick locations and labels for the x-axis
     xtick_locations = np.arange(
-        xtick_step * time_resolution,
-        number_times,
-        xtick_step * time_resolution,
+        xtick_step * sampling_frequency,
+        number_samples,
+        xtick_step * sampling_frequency,
     )
     xtick_labels = np.arange(
-        xtick_step, number_times / time_resolution, xtick_step
+        xtick_step, number_samples / sampling_frequency, xtick_step
     ).astype(int)
 
-    # Display the CQT chromagram in seconds
-    plt.imshow(cqt_chromagram, aspect="auto", cmap="jet", origin="lower")
+    # Plot the signal in seconds
+    plt.plot(audio_signal)
+    plt.autoscale(tight=True)
     plt.xticks(ticks=xtick_locations, labels=xtick_labels)
     plt.xlabel("Time (s)")
-    plt.ylabel("Chroma")
\ No newline at end of file
+
+
+@_profile
+def specshow(
+    audio_spectrogram,
+    number_samples,
+    sampling_frequency,
+    xtick_step=1,
+    ytick_step=1000,
+    pooling="max",
+):
+    """
+    Display a spectrogram in dB, seconds, and Hz.
+
+    Inputs:
+        audio_spectrogram: audio spectrogram (without DC and mirrored frequencies) (number_frequencies, number_times)
+        number_samples: number of samples from the original signal
+        sampling_frequency: sampling frequency from the original signal in Hz
+        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        ytick_step: step for the y-axis ticks in Hz (default: 1000 Hz)
+        pooling: pooling of the spectrogram down to the pixel grid of the axes before the display ("max", "mean", or None) (default: "max")
+    """
+
+    # Get the number of frequency channels and time frames
+    number_frequencies, number_times = np.shape(audio_spectrogram)
+
+    # Derive the number of seconds and Hertz
+    number_seconds = number_samples / sampling_frequency
+    number_hertz = sampling_frequency / 2
+
+    # Derive the number of time frames per second and the number of frequency channels per Hz
+    time_resolution = number_times / number_seconds
+    frequency_resolution = number_frequencies / number_hertz
+
+    # Prepare the tick locations and labels for the x-axis
+    xtick_locations = np.arange(
+        xtick_step * time_resolution,
+        number_times,
+        xtick_step * time_resolution,
+    )
+    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
+
+    # Prepare the tick locations and labels for the y-axis
+    ytick_locations = np.arange(
+        ytick_step * frequency_resolution,
+        number_frequencies,
+        ytick_step * frequency_resolution,
+    )
+    ytick_labels = np.arange(ytick_step, number_hertz, ytick_step).astype(int)
+
+    # Pool the spectrogram down to the pixel grid of the axes (to only compute the dB on the reduced data)
+    audio_spectrogram, image_extent = _poolimage(audio_spectrogram, pooling)
+
+    # Display the spectrogram in dB, seconds, and Hz
+    plt.imshow(
+        20 * np.log10(audio_spectrogram),
+        aspect="auto",
+        cmap="jet",
+        origin="lower",
+        extent=image_extent,
+    )
+    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
+    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
+    plt.xlim(-0.5, number_times - 0.5)
+    plt.ylim(-0.5, number_frequencies - 0.5)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Frequency (Hz)")
+
+
+@_profile
+def melspecshow(
+    mel_spectrogram,
+    number_samples,
+    sampling_frequency,
+    window_length,
+    xtick_step=1,
+    pooling="max",
+):
+    """
+    Display a mel spectrogram in dB, seconds, and Hz.
+
+    Inputs:
+        mel_spectrogram: mel spectrogram (number_mels, number_times)
+        number_samples: number of samples from the original signal
+        sampling_frequency: sampling frequency from the original signal in Hz
+        window_length: window length from the Fourier analysis in number of samples
+        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        pooling: pooling of the mel spectrogram down to the pixel grid of the axes before the display ("max", "mean", or None) (default: "max")
+    """
+
+    # Get the number of mels and time frames
+    number_mels, number_times = np.shape(mel_spectrogram)
+
+    # Derive the number of seconds and the number of time frames per second
+    number_seconds = number_samples / sampling_frequency
+    time_resolution = number_times / number_seconds
+
+    # Derive the minimum and maximum mel
+    minimum_mel = 2595 * np.log10(1 + (sampling_frequency / window_length) / 700)
+    maximum_mel = 2595 * np.log10(1 + (sampling_frequency / 2) / 700)
+
+    # Compute the mel scale (linearly spaced)
+    mel_scale = np.linspace(minimum_mel, maximum_mel, number_mels)
+
+    # Derive the Hertz scale (log spaced)
+    hertz_scale = 700 * (np.power(10, mel_scale / 2595) - 1)
+
+    # Prepare the tick locations and labels for the x-axis
+    xtick_locations = np.arange(
+        xtick_step * time_resolution,
+        number_times,
+        xtick_step * time_resolution,
+    )
+    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
+
+    # Prepare the tick locations and labels for the y-axis
+    ytick_locations = np.arange(0, number_mels, 8)
+    ytick_labels = hertz_scale[::8].astype(int)
+
+    # Pool the mel spectrogram down to the pixel grid of the axes (to only compute the dB on the reduced data)
+    mel_spectrogram, image_extent = _poolimage(mel_spectrogram, pooling)
+
+    # Display the mel spectrogram in dB, seconds, and Hz
+    plt.imshow(
+        20 * np.log10(mel_spectrogram),
+        aspect="auto",
+        cmap="jet",
+        origin="lower",
+        extent=image_extent,
+    )
+    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
+    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
+    plt.xlim(-0.5, number_times - 0.5)
+    plt.ylim(-0.5, number_mels - 0.5)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Frequency (Hz)")
+
+
+@_profile
+def mfccshow(
+    audio_mfcc,
+    number_samples,
+    sampling_frequency,
+    xtick_step=1,
+    pooling="mean",
+):
+    """
+    Display MFCCs in seconds.
+
+    Inputs:
+        audio_mfcc: audio MFCCs (number_coefficients, number_times)
+        number_samples: number of samples from the original signal
+        sampling_frequency: sampling frequency from the original signal in Hz
+        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        pooling: pooling of the MFCCs down to the pixel grid of the axes before the display ("max", "mean", or None) (default: "mean")
+    """
+
+    # Get the number of coefficients and time frames
+    number_coefficients, number_times = np.shape(audio_mfcc)
+
+    # Derive the number of seconds and the number of time frames per second
+    number_seconds = number_samples / sampling_frequency
+    time_resolution = number_times / number_seconds
+
+    # Prepare the tick locations and labels for the x-axis
+    xtick_locations = np.arange(
+        xtick_step * time_resolution,
+        number_times,
+        xtick_step * time_resolution,
+    )
+    xtick_labels = np.arange(xtick_step, number_seconds, xtick_step).astype(int)
+
+    # Pool the MFCCs down to the pixel grid of the axes
+    audio_mfcc, image_extent = _poolimage(audio_mfcc, pooling)
+
+    # Display the MFCCs in seconds
+    plt.imshow(
+        audio_mfcc, aspect="auto", cmap="jet", origin="lower", extent=image_extent
+    )
+    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
+    plt.xlim(-0.5, number_times - 0.5)
+    plt.ylim(-0.5, number_coefficients - 0.5)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Coefficients")
+
+
+@_profile
+def cqtspecshow(
+    cqt_spectrogram,
+    time_resolution,
+    octave_resolution,
+    minimum_frequency,
+    xtick_step=1,
+    pooling="max",
+):
+    """
+    Display a CQT spectrogram in dB, seconds, and Hz.
+
+    Inputs:
+        cqt_spectrogram: CQT spectrogram (number_frequencies, number_times)
+        time_resolution: number of time frames per second
+        octave_resolution: number of frequency channels per octave
+        minimum_frequency: minimum frequency in Hz
+        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        pooling: pooling of the CQT spectrogram down to the pixel grid of the axes before the display ("max", "mean", or None) (default: "max")
+    """
+
+    # Get the number of frequency channels and time frames
+    number_frequencies, number_times = np.shape(cqt_spectrogram)
+
+    # Prepare the tick locations and labels for the x-axis
+    xtick_locations = np.arange(
+        xtick_step * time_resolution,
+        number_times,
+        xtick_step * time_resolution,
+    )
+    xtick_labels = np.arange(
+        xtick_step, number_times / time_resolution, xtick_step
+    ).astype(int)
+
+    # Prepare the tick locations and labels for the y-axis
+    ytick_locations = np.arange(0, number_frequencies, octave_resolution)
+    ytick_labels = (
+        minimum_frequency * pow(2, ytick_locations / octave_resolution)
+    ).astype(int)
+
+    # Pool the CQT spectrogram down to the pixel grid of the axes (to only compute the dB on the reduced data)
+    cqt_spectrogram, image_extent = _poolimage(cqt_spectrogram, pooling)
+
+    # Display the CQT spectrogram in dB and seconds, and Hz
+    plt.imshow(
+        20 * np.log10(cqt_spectrogram),
+        aspect="auto",
+        cmap="jet",
+        origin="lower",
+        extent=image_extent,
+    )
+    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
+    plt.yticks(ticks=ytick_locations, labels=ytick_labels)
+    plt.xlim(-0.5, number_times - 0.5)
+    plt.ylim(-0.5, number_frequencies - 0.5)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Frequency (Hz)")
+
+
+@_profile
+def cqtchromshow(
+    cqt_chromagram,
+    time_resolution,
+    xtick_step=1,
+    pooling="mean",
+):
+    """
+    Display a CQT chromagram in seconds.
+
+    Inputs:
+        audio_chromagram: CQT chromagram (number_chromas, number_times)
+        time_resolution: number of time frames per second
+        xtick_step: step for the x-axis ticks in seconds (default: 1 second)
+        pooling: pooling of the CQT chromagram down to the pixel grid of the axes before the display ("max", "mean", or None) (default: "mean")
+    """
+
+    # Get the number of chromas and time frames
+    number_chromas, number_times = np.shape(cqt_chromagram)
+
+    # Prepare the tick locations and labels for the x-axis
+    xtick_locations = np.arange(
+        xtick_step * time_resolution,
+        number_times,
+        xtick_step * time_resolution,
+    )
+    xtick_labels = np.arange(
+        xtick_step, number_times / time_resolution, xtick_step
+    ).astype(int)
+
+    # Pool the CQT chromagram down to the pixel grid of the axes
+    cqt_chromagram, image_extent = _poolimage(cqt_chromagram, pooling)
+
+    # Display the CQT chromagram in seconds
+    plt.imshow(
+        cqt_chromagram, aspect="auto", cmap="jet", origin="lower", extent=image_extent
+    )
+    plt.xticks(ticks=xtick_locations, labels=xtick_labels)
+    plt.xlim(-0.5, number_times - 0.5)
+    plt.ylim(-0.5, number_chromas - 0.5)
+    plt.xlabel("Time (s)")
+    plt.ylabel("Chroma")
+
+
+class Profiler:
+    """
+    Record the wall time, number of calls, and peak and net allocated bytes of the functions and of their stages.
+
+    Input:
+        trace_memory: record the peak and net allocated bytes using tracemalloc (slower) (default: False)
+    Methods:
+        todict(): return the records {name: {"calls": number of calls, "time": wall time in seconds,
+            "peak_bytes": largest peak of the traced memory over the memory at the start (for all the threads),
+            "net_bytes": net allocated bytes (still allocated at the end)}}, with the functions as "function" and
+            their stages as "function.stage"
+        tojson(json_file=None): return the records as a JSON string (and write them in a JSON file if given)
+
+    Example: Find where the time goes when computing MFCCs.
+        # Import the needed modules
+        import numpy as np
+        import scipy.signal
+        import zaf
+
+        # Read the audio signal (normalized) with its sampling frequency in Hz, and average it over its channels
+        audio_signal, sampling_frequency = zaf.wavread("audio_file.wav")
+        audio_signal = np.mean(audio_signal, 1)
+
+        # Set the parameters for the MFCCs
+        window_length = pow(2, int(np.ceil(np.log2(0.04*sampling_frequency))))
+        window_function = scipy.signal.hamming(window_length, sym=False)
+        step_length = int(window_length/2)
+        mel_filterbank = zaf.melfilterbank(sampling_frequency, window_length, 40)
+
+        # Compute the MFCCs while recording the functions and their stages
+        with zaf.Profiler(trace_memory=True) as audio_profiler:
+            audio_mfcc = zaf.mfcc(audio_signal, window_function, step_length, mel_filterbank, 20)
+
+        # Print the records
+        print(audio_profiler.tojson())
+    """
+
+    def __init__(self, trace_memory=False):
+
+        # Initialize the records, their lock (for the threads), and the per-thread call stacks
+        self.trace_memory = trace_memory
+        self.records = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._previous_profiler = None
+        self._started_tracing = False
+
+    def __enter__(self):
+
+        # Start tracing the memory allocations if needed
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        # Activate the profiler (and keep the previous one to restore it)
+        global _profiler
+        self._previous_profiler = _profiler
+        _profiler = self
+
+        return self
+
+    def __exit__(self, *exception_info):
+
+        # Restore the previous profiler and stop tracing the memory allocations if started here
+        global _profiler
+        _profiler = self._previous_profiler
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def todict(self):
+
+        with self._lock:
+            return {name: dict(record) for name, record in self.records.items()}
+
+    def tojson(self, json_file=None):
+
+        json_string = json.dumps(self.todict(), indent=4)
+        if json_file is not None:
+            with open(json_file, "w") as file_object:
+                file_object.write(json_string)
+
+        return json_string
+
+    def _memory(self):
+
+        # Get the current traced memory in bytes (0 if not tracing)
+        if not (self.trace_memory and tracemalloc.is_tracing()):
+            return 0
+        current_memory, peak_memory = tracemalloc.get_traced_memory()
+
+        # Update the peaks of the calls and of their stages on the call stack with the peak since the previous
+        # marker, and reset it for the next one
+        for function_call in self._stack():
+            function_call[3] = max(function_call[3], peak_memory)
+            function_call[4] = max(function_call[4], peak_memory)
+        tracemalloc.reset_peak()
+
+        return current_memory
+
+    def _stack(self):
+
+        # Get the call stack of the current thread
+        if not hasattr(self._local, "call_stack"):
+            self._local.call_stack = []
+        return self._local.call_stack
+
+    def _record(self, name, wall_time, peak_bytes, net_bytes):
+
+        with self._lock:
+            record = self.records.setdefault(
+                name, {"calls": 0, "time": 0.0, "peak_bytes": 0, "net_bytes": 0}
+            )
+            record["calls"] += 1
+            record["time"] += wall_time
+            record["peak_bytes"] = max(record["peak_bytes"], peak_bytes)
+            record["net_bytes"] += net_bytes
+
+    def _call(self, function, args, kwargs):
+
+        # Push the function on the call stack with the start time, memory, and peak memory of its current stage and
+        # the peak memory of the call
+        call_stack = self._stack()
+        start_time, start_memory = time.perf_counter(), self._memory()
+        call_stack.append(
+            [function.__name__, start_time, start_memory, start_memory, start_memory]
+        )
+
+        # Call the function, and record it even if it raises an exception
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end_memory = self._memory()
+            function_call = call_stack.pop()
+            self._record(
+                function.__name__,
+                time.perf_counter() - start_time,
+                function_call[4] - start_memory,
+                end_memory - start_memory,
+            )
+
+    def _stage(self, stage_name):
+
+        # Ignore the stages outside of a recorded function (e.g., in worker threads)
+        call_stack = self._stack()
+        if not call_stack:
+            return
+
+        # Record the stage since the previous one (or the start of the function) and start the next one
+        current_time, current_memory = time.perf_counter(), self._memory()
+        function_call = call_stack[-1]
+        self._record(
+            f"{function_call[0]}.{stage_name}",
+            current_time - function_call[1],
+            function_call[3] - function_call[2],
+            current_memory - function_call[2],
+        )
+        function_call[1:4] = [current_time, current_memory, current_memory]
+
+
+def _overlapadd(audio_frames, step_length, audio_signal):
+    """
+    Overlap-add frames into a preallocated signal (in place), one vectorized sum per step-long part.
+
+    Inputs:
+        audio_frames: audio frames (number_times, window_length)
+        step_length: step length in samples
+        audio_signal: preallocated signal (at least number_times*step_length+window_length samples)
+    Output:
+        audio_signal: overlap-added signal (the same array)
+    """
+
+    # Get the number of time frames and the window length in samples
+    number_times, window_length = np.shape(audio_frames)
+
+    # Reset the signal
+    audio_signal[:] = 0
+
+    # Loop over the step-long parts of the frames
+    # (the parts at the same offset in consecutive frames do not overlap and can be added at once)
+    for i in range(0, window_length, step_length):
+
+        # Add the parts of all the frames at the current offset
+        part_length = min(step_length, window_length - i)
+        audio_signal[i : i + number_times * step_length].reshape(
+            number_times, step_length
+        )[:, 0:part_length] += audio_frames[:, i : i + part_length]
+
+    return audio_signal
+
+
+def _poolimage(audio_image, pooling):
+    """
+    Pool an image (e.g., a spectrogram) down to the pixel grid of the current axes.
+
+    Inputs:
+        audio_image: audio image (number_rows, number_columns)
+        pooling: pooling over the rows and columns ("max", "mean", or None for no pooling)
+    Outputs:
+        audio_image: pooled audio image (number_rows/row_factor, number_columns/column_factor) (rounded up)
+        image_extent: extent of the pooled image in the coordinates of the original image (left, right, bottom, top)
+    """
+
+    # Check the pooling (also when the image is too small to be pooled)
+    if pooling not in ("max", "mean", None):
+        raise ValueError(f"Unknown pooling {pooling!r}, use 'max', 'mean', or None.")
+
+    # Get the number of rows and columns
+    number_rows, number_columns = np.shape(audio_image)
+
+    # Derive the pooling factors from the size of the current axes in pixels
+    if pooling is None:
+        row_factor, column_factor = 1, 1
+    else:
+        axes_extent = plt.gca().get_window_extent()
+        row_factor = int(np.ceil(number_rows / max(int(axes_extent.height), 1)))
+        column_factor = int(np.ceil(number_columns / max(int(axes_extent.width), 1)))
+
+    # Loop over the columns and the rows
+    # (reduceat pools every group of indices without padding or copying the image, the last group can be shorter)
+    for axis_index, pooling_factor in ((1, column_factor), (0, row_factor)):
+
+        # Skip the axis if there is nothing to pool
+        if pooling_factor == 1:
+            continue
+
+        # Pool the groups of rows or columns using their maximum or mean
+        group_indices = np.arange(0, np.shape(audio_image)[axis_index], pooling_factor)
+        if pooling == "max":
+            audio_image = np.maximum.reduceat(
+                audio_image, group_indices, axis=axis_index
+            )
+        else:
+            group_lengths = np.diff(
+                np.append(group_indices, np.shape(audio_image)[axis_index])
+            )
+            audio_image = np.add.reduceat(
+                audio_image, group_indices, axis=axis_index
+            ) / np.expand_dims(group_lengths, 1 - axis_index)
+
+    # Derive the extent of the pooled image in the coordinates of the original image
+    # (the axes limits then crop the last pooled row and column to the original size)
+    image_extent = (
+        -0.5,
+        np.shape(audio_image)[1] * column_factor - 0.5,
+        -0.5,
+        np.shape(audio_image)[0] * row_factor - 0.5,
+    )
+
+    return audio_image, image_extent
+
+
+def _threadchunks(number_times, workers, compute_chunk):
+    """
+    Split the time frames into contiguous chunks and compute them in a thread pool.
+
+    Inputs:
+        number_times: number of time frames
+        workers: number of threads (and chunks)
+        compute_chunk: function computing the time frames from start_index to end_index (excluded)
+    """
+
+    # Compute all the time frames at once if there is only one worker
+    if workers == 1:
+        if number_times > 0:
+            compute_chunk(0, number_times)
+        return
+
+    # Derive the boundaries of the contiguous chunks (without the empty ones)
+    chunk_indices = np.linspace(0, number_times, workers + 1).astype(int)
+    chunk_indices = np.unique(chunk_indices)
+
+    # Compute the chunks in the thread pool (and raise the exceptions of the threads, if any)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        list(executor.map(compute_chunk, chunk_indices[:-1], chunk_indices[1:]))
+
+
+def _framerms(audio_signal, frame_length, step_length, number_times):
+    """
+    Compute the root-mean-square (RMS) of the frames of a signal using the cumulative sum of its energy.
+
+    Inputs:
+        audio_signal: audio signal (zero-padded as for the framing) (number_samples,)
+        frame_length: frame length in samples
+        step_length: step length in samples
+        number_times: number of time frames
+    Output:
+        frame_rms: RMS of the frames (number_times,)
+    """
+
+    # Compute the cumulative energy of the signal (one pass, instead of one sum per frame)
+    cumulative_energy = np.concatenate(([0], np.cumsum(np.power(audio_signal, 2))))
+
+    # Derive the energy of the frames from the differences of the cumulative energy
+    start_indices = np.arange(number_times) * step_length
+    frame_energy = (
+        cumulative_energy[start_indices + frame_length]
+        - cumulative_energy[start_indices]
+    )
+
+    # Compute the RMS (and clip the small negative energies caused by rounding errors)
+    frame_rms = np.sqrt(np.maximum(frame_energy, 0) / frame_length)
+
+    return frame_rms
+
+
+def _segmentframes(
+    audio_signal, frame_length, step_length, frame_offset, start_time, end_time
+):
+    """
+    Frame a range of time frames of a signal, zero-padded where they are outside of the signal.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        frame_length: frame length in samples
+        step_length: step length in samples
+        frame_offset: zero-padding length at the start of the signal (the first frame starts at -frame_offset)
+        start_time: index of the first time frame
+        end_time: index of the last time frame (excluded)
+    Output:
+        audio_frames: audio frames (strided view of the segment) (end_time-start_time, frame_length)
+    """
+
+    # Derive the samples spanned by the time frames
+    start_index = start_time * step_length - frame_offset
+    end_index = (end_time - 1) * step_length - frame_offset + frame_length
+
+    # Get the segment of the signal, zero-padded where it is outside of the signal
+    audio_segment = np.zeros(max(end_index - start_index, frame_length))
+    clipped_start = max(start_index, 0)
+    clipped_end = min(end_index, len(audio_signal))
+    if clipped_end > clipped_start:
+        audio_segment[clipped_start - start_index : clipped_end - start_index] = (
+            audio_signal[clipped_start:clipped_end]
+        )
+
+    # Frame the segment (strided view)
+    audio_frames = np.lib.stride_tricks.sliding_window_view(
+        audio_segment, frame_length
+    )[::step_length, :][0 : max(end_time - start_time, 0), :]
+
+    return audio_frames
+
+
+def _editframes(
+    number_times, frame_length, step_length, frame_offset, start_index, end_index
+):
+    """
+    Derive the range of time frames whose windows overlap an edited range of samples.
+
+    Inputs:
+        number_times: number of time frames
+        frame_length: frame length in samples
+        step_length: step length in samples
+        frame_offset: zero-padding length at the start of the signal (the first frame starts at -frame_offset)
+        start_index: index of the first edited sample
+        end_index: index of the last edited sample (excluded)
+    Outputs:
+        start_time: index of the first overlapping time frame
+        end_time: index of the last overlapping time frame (excluded)
+    """
+
+    # The time frame j spans the samples from j*step_length-frame_offset to j*step_length-frame_offset+frame_length
+    start_time = max((start_index + frame_offset - frame_length) // step_length + 1, 0)
+    end_time = min(-(-(end_index + frame_offset) // step_length), number_times)
+
+    return start_time, max(end_time, start_time)
+
+
+def _mdctframes(audio_frames, window_function):
+    """
+    Compute the MDCT of frames using the FFT (vectorized over the frames).
+
+    Inputs:
+        audio_frames: audio frames (number_times, window_length)
+        window_function: window function (window_length,)
+    Output:
+        audio_mdct: audio MDCT (time-major) (number_times, number_frequencies)
+    """
+
+    # Get the window length and derive the number of frequencies
+    window_length = len(window_function)
+    number_frequencies = int(window_length / 2)
+
+    # Prepare the pre-processing (with the window function) and post-processing arrays (as in zaf.mdct)
+    preprocessing_array = window_function * np.exp(
+        -1j * np.pi / window_length * np.arange(0, window_length)
+    )
+    postprocessing_array = np.exp(
+        -1j
+        * np.pi
+        / window_length
+        * (window_length / 2 + 1)
+        * np.arange(0.5, window_length / 2 + 0.5)
+    )
+
+    # Compute the FFT of the pre-processed frames, truncate to the first half, and post-process
+    audio_mdct = np.real(
+        np.fft.fft(audio_frames * preprocessing_array, axis=1)[:, 0:number_frequencies]
+        * postprocessing_array
+    )
+
+    return audio_mdct
+
+
+def _wavheader(audio_file):
+    """
+    Read the format and the location of the data of a WAVE file from its RIFF header.
+
+    Input:
+        audio_file: path to an audio file
+    Outputs:
+        format_tag: 1 for PCM, or 3 for IEEE float
+        number_channels: number of channels
+        sampling_frequency: sampling frequency in Hz
+        number_bits: number of bits per sample
+        data_offset: offset of the data in bytes
+        number_samples: number of samples per channel
+    """
+
+    with open(audio_file, "rb") as file_object:
+
+        # Check the RIFF and WAVE identifiers
+        riff_header = file_object.read(12)
+        if riff_header[0:4] != b"RIFF" or riff_header[8:12] != b"WAVE":
+            raise ValueError(f"{audio_file} is not a WAVE file.")
+        file_size = file_object.seek(0, 2)
+        chunk_offset = 12
+
+        # Walk through the chunks until the data chunk, reading the format chunk on the way
+        format_tag = None
+        while chunk_offset + 8 <= file_size:
+            file_object.seek(chunk_offset)
+            chunk_header = file_object.read(8)
+            chunk_size = int(np.frombuffer(chunk_header[4:8], dtype="<u4")[0])
+            if chunk_header[0:4] == b"fmt ":
+                format_chunk = file_object.read(chunk_size)
+                format_tag, number_channels = np.frombuffer(
+                    format_chunk[0:4], dtype="<u2"
+                )
+                sampling_frequency = int(
+                    np.frombuffer(format_chunk[4:8], dtype="<u4")[0]
+                )
+                number_bits = int(np.frombuffer(format_chunk[14:16], dtype="<u2")[0])
+
+                # Take the format tag from the sub-format for WAVE_FORMAT_EXTENSIBLE
+                if format_tag == 0xFFFE:
+                    format_tag = np.frombuffer(format_chunk[24:26], dtype="<u2")[0]
+                format_tag = int(format_tag)
+                number_channels = int(number_channels)
+            elif chunk_header[0:4] == b"data":
+                break
+
+            # Skip to the next chunk (chunks are padded to an even size)
+            chunk_offset = chunk_offset + 8 + chunk_size + chunk_size % 2
+        else:
+            raise ValueError(f"{audio_file} has no data chunk.")
+
+    # Check the format
+    if format_tag is None:
+        raise ValueError(f"{audio_file} has no format chunk.")
+    if (format_tag, number_bits) not in (
+        (1, 8),
+        (1, 16),
+        (1, 24),
+        (1, 32),
+        (3, 32),
+        (3, 64),
+    ):
+        raise ValueError(
+            f"Unsupported WAVE format (format tag {format_tag}, {number_bits} bits)."
+        )
+
+    # Derive the number of samples, clipping the data chunk to the file (e.g., for unfinished recordings)
+    data_offset = chunk_offset + 8
+    data_size = min(chunk_size, file_size - data_offset)
+    number_samples = data_size // (number_channels * number_bits // 8)
+
+    return (
+        format_tag,
+        number_channels,
+        sampling_frequency,
+        number_bits,
+        data_offset,
+        number_samples,
+    )
+
+
+def _jsonvalue(parameter_value, parameter_name):
+    """
+    Convert a parameter value to JSON types (NumPy scalars and arrays to numbers and lists), recursively.
+
+    Inputs:
+        parameter_value: parameter value (JSON type, NumPy scalar or array, or dictionary, list, or tuple of them)
+        parameter_name: name of the parameter (for the error message)
+    Output:
+        parameter_value: parameter value with JSON types only
+    """
+
+    # Convert the NumPy scalars and arrays to Python numbers and lists (and their content, for object arrays)
+    if isinstance(parameter_value, (np.generic, np.ndarray)):
+        return _jsonvalue(parameter_value.tolist(), parameter_name)
+
+    # Keep the JSON types, and convert the content of the dictionaries, lists, and tuples
+    if parameter_value is None or isinstance(parameter_value, (bool, int, float, str)):
+        return parameter_value
+    if isinstance(parameter_value, dict):
+        return {
+            item_key: _jsonvalue(item_value, f"{parameter_name}.{item_key}")
+            for item_key, item_value in parameter_value.items()
+        }
+    if isinstance(parameter_value, (list, tuple)):
+        return [
+            _jsonvalue(item_value, f"{parameter_name}[{item_index}]")
+            for item_index, item_value in enumerate(parameter_value)
+        ]
+
+    raise TypeError(
+        f"The parameter {parameter_name!r} of type {type(parameter_value).__name__} is not JSON-serializable."
+    )
+
+
+def _batchfeatures(audio_signal, sampling_frequency, feature_name):
+    """
+    Compute the MFCCs or the CQT chromagram of a signal with the parameters of their examples.
+
+    Inputs:
+        audio_signal: audio signal (number_samples,)
+        sampling_frequency: sampling frequency in Hz
+        feature_name: "mfcc" or "cqtchromagram"
+    Outputs:
+        audio_features: audio features (number_features, number_times)
+        time_resolution: number of time frames per second
+    """
+
+    # Compute the MFCCs with a window of about 40 ms, half-overlapping, and 40 mel filters
+    if feature_name == "mfcc":
+        window_length = pow(2, int(np.ceil(np.log2(0.04 * sampling_frequency))))
+        step_length = int(window_length / 2)
+        window_function, mel_filterbank = _batchmfccsetup(
+            sampling_frequency, window_length
+        )
+        audio_features = mfcc(
+            audio_signal, window_function, step_length, mel_filterbank, 20
+        )
+        return audio_features, sampling_frequency / step_length
+
+    # Compute the CQT chromagram with 24 channels per octave from 55 to 3520 Hz, and 25 time frames per second
+    elif feature_name == "cqtchromagram":
+        cqt_kernel = _batchcqtsetup(sampling_frequency)
+        audio_features = cqtchromagram(
+            audio_signal, sampling_frequency, 25, 24, cqt_kernel
+        )
+        return audio_features, 25
+
+    else:
+        raise ValueError(
+            f"Unknown features {feature_name!r}, use 'mfcc' or 'cqtchromagram'."
+        )
+
+
+@functools.lru_cache(maxsize=8)
+def _batchmfccsetup(sampling_frequency, window_length):
+    """Compute (once per sampling frequency) the window function and the mel filterbank for the MFCCs."""
+
+    window_function = scipy.signal.windows.hamming(window_length, sym=False)
+    mel_filterbank = melfilterbank(sampling_frequency, window_length, 40)
+
+    return window_function, mel_filterbank
+
+
+@functools.lru_cache(maxsize=8)
+def _batchcqtsetup(sampling_frequency):
+    """Compute (once per sampling frequency) the CQT kernel for the CQT chromagram."""
+
+    return cqtkernel(sampling_frequency, 24, 55, 3520)
+
+
+@functools.lru_cache(maxsize=8)
+def _multimelsetup(sampling_frequency, window_length, number_mels):
+    """Compute (once per resolution) the window function and the (dense) mel filterbank for the mel spectrograms."""
+
+    window_function = scipy.signal.windows.hamming(window_length, sym=False)
+    mel_filterbank = melfilterbank(
+        sampling_frequency, window_length, number_mels
+    ).toarray()
+
+    return window_function, mel_filterbank
+
+
+def _similarityfeatures(audio_features, metric, dtype):
+    """
+    Prepare features for the self-similarity tiles: time-major, contiguous, normalized for the cosine similarity.
+
+    Inputs:
+        audio_features: audio features (number_features, number_times)
+        metric: "cosine" or "euclidean"
+        dtype: data type of the computations
+    Outputs:
+        audio_features: prepared audio features (number_times, number_features)
+        feature_norms: squared norms of the time frames (for "euclidean") (number_times,)
+    """
+
+    # Transpose the features to time-major rows (contiguous for the matrix products)
+    audio_features = np.ascontiguousarray(np.transpose(audio_features), dtype=dtype)
+    feature_norms = np.sum(np.power(audio_features, 2), axis=1)
+
+    # Normalize the time frames to a unit norm for the cosine similarity
+    if metric == "cosine":
+        audio_features = audio_features / (
+            np.sqrt(feature_norms)[:, np.newaxis] + np.finfo(dtype).eps
+        )
+    elif metric != "euclidean":
+        raise ValueError(f"Unknown metric {metric!r}, use 'cosine' or 'euclidean'.")
+
+    return audio_features, feature_norms
+
+
+def _similaritytile(
+    audio_features, feature_norms, metric, start_row, end_row, start_column, end_column
+):
+    """
+    Compute a tile of the self-similarity matrix with one matrix product (BLAS).
+
+    Inputs:
+        audio_features: prepared audio features (number_times, number_features)
+        feature_norms: squared norms of the time frames (number_times,)
+        metric: "cosine" or "euclidean"
+        start_row, end_row: range of the time frames of the rows (end excluded)
+        start_column, end_column: range of the time frames of the columns (end excluded)
+    Output:
+        similarity_tile: tile of the self-similarity matrix (end_row-start_row, end_column-start_column)
+    """
+
+    # Compute the dot products of the rows and the columns
+    similarity_tile = np.matmul(
+        audio_features[start_row:end_row, :],
+        audio_features[start_column:end_column, :].T,
+    )
+
+    # Derive the Euclidean distances from the dot products and the norms (clipping the small negative values)
+    if metric == "euclidean":
+        similarity_tile *= -2
+        similarity_tile += feature_norms[start_row:end_row, np.newaxis]
+        similarity_tile += feature_norms[start_column:end_column]
+        np.maximum(similarity_tile, 0, out=similarity_tile)
+        np.sqrt(similarity_tile, out=similarity_tile)
+
+    return similarity_tile
+
+
+def _similaritylags(
+    audio_features, feature_norms, metric, start_row, end_row, start_lag, end_lag
+):
+    """
+    Compute the similarities of time frames with the time frames a range of time lags after them (a skewed tile).
+
+    Inputs:
+        audio_features: prepared audio features (number_times, number_features)
+        feature_norms: squared norms of the time frames (number_times,)
+        metric: "cosine" or "euclidean"
+        start_row, end_row: range of the time frames of the rows (end excluded)
+        start_lag, end_lag: range of the time lags (end excluded, negative for the time frames before)
+    Output:
+        similarity_lags: similarities of the rows with the time frames a lag after them, 0 outside of the matrix
+            (end_row-start_row, end_lag-start_lag)
+    """
+
+    # Compute the tile of the rows against the columns they reach within the lags (inside of the matrix)
+    number_times = len(audio_features)
+    first_column = start_row + start_lag
+    last_column = end_row - 1 + end_lag
+    start_column = min(max(first_column, 0), number_times)
+    end_column = max(min(last_column, number_times), start_column)
+    similarity_tile = _similaritytile(
+        audio_features,
+        feature_norms,
+        metric,
+        start_row,
+        end_row,
+        start_column,
+        end_column,
+    )
+
+    # Zero-pad the tile to all the columns reached, and take the window of lags starting one column further
+    # at every row (strided view, copied by the indexing)
+    padded_tile = np.zeros(
+        (end_row - start_row, last_column - first_column), dtype=similarity_tile.dtype
+    )
+    padded_tile[:, start_column - first_column : end_column - first_column] = (
+        similarity_tile
+    )
+    similarity_lags = np.lib.stride_tricks.sliding_window_view(
+        padded_tile, end_lag - start_lag, axis=1
+    )[np.arange(end_row - start_row), np.arange(end_row - start_row)]
+
+    return similarity_lags
+
+
+def _halvefeatures(audio_features):
+    """Halve the number of time frames of (time-major) features by averaging pairs of time frames."""
+
+    number_times = len(audio_features)
+    if number_times % 2 == 1:
+        audio_features = np.concatenate((audio_features, audio_features[-1:, :]))
+
+    return (audio_features[0::2, :] + audio_features[1::2, :]) / 2
+
+
+def _checklayout(layout):
+    """Check the layout of an output, "frequency_major" or "time_major"."""
+
+    if layout not in ("frequency_major", "time_major"):
+        raise ValueError(
+            f"Unknown layout {layout!r}, use 'frequency_major' or 'time_major'."
+        )
+
+
+def _quantize(audio_features, quantization, dynamic_range):
+    """
+    Convert magnitude features to dB and quantize them, in place in one pass over the array.
+
+    Inputs:
+        audio_features: audio features (magnitudes, overwritten) (number_features, number_times)
+        quantization: "float16", "uint8", or "uint16"
+        dynamic_range: range in dB under the maximum kept by the quantization (lower values are clipped)
+    Outputs:
+        audio_features: quantized audio features in dB (number_features, number_times)
+        feature_scale: scale in dB of the quantized values
+        feature_offset: offset in dB of the quantized values
+    """
+
+    # Convert the magnitudes to dB in place (the zeros are clipped to the smallest positive float)
+    np.maximum(audio_features, np.finfo(float).tiny, out=audio_features)
+    np.log10(audio_features, out=audio_features)
+    audio_features *= 20
+
+    # Clip the values under the dynamic range (relative to the maximum, or to 0 dB if there is no value)
+    maximum_value = np.max(audio_features) if np.size(audio_features) > 0 else 0
+    minimum_value = float(maximum_value - dynamic_range)
+    np.maximum(audio_features, minimum_value, out=audio_features)
+
+    # Cast to half precision (the values are kept in dB)
+    if quantization == "float16":
+        return audio_features.astype(np.float16), 1.0, 0.0
+
+    # Map the dynamic range to the integer levels, and round to the nearest ones
+    if quantization == "uint8":
+        number_levels = 256
+    elif quantization == "uint16":
+        number_levels = 65536
+    else:
+        raise ValueError(
+            f"Unsupported quantization {quantization!r}, use 'float16', 'uint8', or 'uint16'."
+        )
+    feature_scale = dynamic_range / (number_levels - 1)
+    feature_offset = minimum_value
+    audio_features -= feature_offset
+    audio_features /= feature_scale
+    np.rint(audio_features, out=audio_features)
+    np.minimum(audio_features, number_levels - 1, out=audio_features)
+    audio_features = audio_features.astype(np.dtype(quantization))
+
+    return audio_features, feature_scale, feature_offset
+
+
+if __name__ == "__main__":
+
+    # Parse the command-line arguments
+    argument_parser = argparse.ArgumentParser(
+        description="Extract features from a list of audio files into feature files, in shards and resumable."
+    )
+    argument_parser.add_argument(
+        "manifest_file", help="manifest file (one path per line)"
+    )
+    argument_parser.add_argument(
+        "output_directory", help="directory of the feature files"
+    )
+    argument_parser.add_argument(
+        "--features", default="mfcc", choices=["mfcc", "cqtchromagram"]
+    )
+    argument_parser.add_argument("--shard", default="0/1", help="i/N (default: 0/1)")
+    argument_parser.add_argument("--checkpoint-file", default=None)
+    argument_parser.add_argument("--prefetch-length", type=int, default=2)
+    argument_parser.add_argument("--workers", type=int, default=1)
+    argument_parser.add_argument(
+        "--input-directory", default=None, help="default: the current directory"
+    )
+    arguments = argument_parser.parse_args()
+
+    # Run the shard and list the failed files
+    failed_files = batchextract(
+        arguments.manifest_file,
+        arguments.output_directory,
+        arguments.features,
+        arguments.shard,
+        arguments.checkpoint_file,
+        prefetch_length=arguments.prefetch_length,
+        workers=arguments.workers,
+        input_directory=arguments.input_directory,
+        verbose=True,
+    )
+    for audio_file, error_message in failed_files.items():
+        print(f"Failed: {audio_file} ({error_message})")